@@ -1,7 +1,64 @@
 # -*- coding: utf-8 -*-
 #
-# © 2011 SimpleGeo, Inc All rights reserved.
+# © 2011 SimpleGeo, Inc. All rights reserved.
 # Author: Ian Eure <ian@simplegeo.com>
 #
 
-"""Make your code robust."""
+"""Make your code robust.
+
+Importing tillicum is cheap: submodules, and the names listed in
+EXPORTS, are only imported when first used.
+
+import tillicum
+tillicum.retry.retry          # -> Imports tillicum.retry
+tillicum.DeadlineExceeded     # -> Imports tillicum.deadline
+"""
+
+import sys
+from types import ModuleType
+from importlib import import_module
+
+SUBMODULES = frozenset((
+        'backoff', 'bulkhead', 'circuit', 'clock', 'contextdecorator',
+        'deadline', 'debug', 'lazy', 'policy', 'ratelimit', 'registry',
+        'retry', 'seqtimer', 'snapshot', 'suppress', 'throttle', 'timeout',
+        'timer', 'trace'))
+
+EXPORTS = {
+    'BulkheadFull': 'bulkhead',
+    'CircuitOpen': 'circuit',
+    'ContextDecorator': 'contextdecorator',
+    'DeadlineExceeded': 'deadline',
+    'Timeout': 'timeout',
+    'debug_on_exception': 'debug',
+    'debug_on_signal': 'debug',
+    'make_suppress': 'suppress',
+    'profile_on_signal': 'debug',
+    'snapshot_on_exception': 'debug',
+}
+
+
+class _namespace(ModuleType):
+
+    """The tillicum package, importing its contents on first use."""
+
+    def __getattr__(self, name):
+        if name in SUBMODULES:
+            return import_module('%s.%s' % (self.__name__, name))
+        if name in EXPORTS:
+            module = import_module('%s.%s' % (self.__name__, EXPORTS[name]))
+            value = getattr(module, name)
+            setattr(self, name, value)
+            return value
+        raise AttributeError("'module' object has no attribute %r" % name)
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | SUBMODULES | set(EXPORTS))
+
+
+_package = _namespace(__name__, __doc__)
+_package.__dict__.update(sys.modules[__name__].__dict__)
+# Keep the original module alive; Python 2 clears the globals of
+# modules when they're freed, which would break the code above.
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
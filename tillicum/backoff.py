@@ -6,12 +6,115 @@
 
 """Slow down as error occur."""
 
-import time
 import logging
-from operator import itemgetter
+import threading
 
+from . import deadline, trace
 from . contextdecorator import ContextDecorator
 from . timer import timer
+from . lazy import lazy_import
+
+multiprocessing = lazy_import('multiprocessing', globals())
+
+
+class history(object):
+
+    """The outcomes of the last recent calls to a service.
+
+    Outcomes are kept in a ring, with a running count of failures, so
+    recording one takes constant time. Each history has its own lock.
+    A history of no recent calls never sees a failure.
+    """
+
+    def __init__(self, recent):
+        self.recent = recent
+        self.failed = [0] * recent
+        self.state = [0, 0, 0]  # Next slot, calls, failures
+        self.lock = threading.Lock()
+
+    def record(self, failed):
+        """Record the outcome of a call, returning (failures, calls)."""
+        if self.recent <= 0:
+            return (0, 0)
+        with self.lock:
+            (index, calls, failures) = self.state
+            if calls == self.recent:
+                failures -= self.failed[index]
+            else:
+                calls += 1
+            self.failed[index] = 1 if failed else 0
+            failures += self.failed[index]
+            self.state[:] = [(index + 1) % self.recent, calls, failures]
+            return (failures, calls)
+
+
+class shared_history(history):
+
+    """A history in shared memory, seen by processes forked after it."""
+
+    def __init__(self, recent):
+        self.recent = recent
+        self.failed = multiprocessing.RawArray('b', recent)
+        self.state = multiprocessing.RawArray('l', 3)
+        self.lock = multiprocessing.Lock()
+
+
+class store(object):
+
+    """Histories shared by every backoff in this process, by key."""
+
+    def __init__(self):
+        self.histories = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, recent):
+        """Return the history for key, creating it if needed.
+
+        Recent is only used when it's created.
+        """
+        hist = self.histories.get(key)
+        if hist is None:
+            with self.lock:
+                hist = self.histories.get(key)
+                if hist is None:
+                    hist = self.histories[key] = history(recent)
+        return hist
+
+
+class shared_store(store):
+
+    """Histories shared by every backoff in this process and its children.
+
+    Histories live in shared memory, so a worker process learns of
+    failures seen by its siblings. They must be created before the
+    workers are forked, so every key must be given up front.
+    """
+
+    def __init__(self, keys, recent=10):
+        self.histories = dict((key, shared_history(recent)) for key in keys)
+
+    def get(self, key, recent):
+        try:
+            return self.histories[key]
+        except KeyError:
+            raise KeyError("No shared backoff history for %r; "
+                           "keys must be given when creating the store"
+                           % (key,))
+
+
+_STORE = store()
+
+
+def get_store():
+    """Return the store which keyed backoffs share history through."""
+    return _STORE
+
+
+def set_store(new):
+    """Share the history of keyed backoffs through a new store."""
+    global _STORE
+    _STORE = new
+
 
 class backoff(ContextDecorator):
 
@@ -22,42 +125,80 @@ class backoff(ContextDecorator):
     increasing amount of time, up to limit seconds. As the error rate
     drops, so does the delay. The original exception is raised after
     the delay.
+
+    The delay never runs past the current deadline; if it would,
+    DeadlineExceeded is raised instead.
+
+    By default, each backoff only knows about its own calls. Backoffs
+    given the same key, such as the name of the service, share their
+    history instead, so failures seen by one slow them all down. To
+    share it between worker processes as well, set_store() a
+    shared_store before forking them. A keyed backoff ignores its own
+    recent; the history keeps the size of the first backoff to use the
+    key, or the one given to the shared_store.
+
+    set_store(shared_store(['geocoder']))
+
+    @backoff(key='geocoder')
+    def geocode(address):
+        pass
+
+    When tracing, each call is a span, with the delay as a child.
     """
 
-    def __init__(self, limit=600, min_sleep=0, recent=10, exceptions=None):
+    instrumented = True
+
+    def __init__(self, limit=600, min_sleep=0, recent=10, exceptions=None,
+                 key=None):
         self.limit = limit
         self.recent = recent
         self.exeptions = exceptions or (Exception,)
         self.timer = timer()
+        self.timer.traced = False
         self.time = None
-        self.results = []
+        self.key = key
+        self.history = history(recent) if key is None else None
         self.min_sleep = min_sleep
 
-    def delay(self, error=None):
-        """Return the current delay."""
-        duration = self.time[-1]
-        self.results.append((duration, error))
-        while len(self.results) > self.recent:
-            self.results.pop(0)
-        failures = len(filter(itemgetter(1), self.results))
+    def delay(self, error=None, duration=None):
+        """Return the current delay.
+
+        The duration of the call defaults to the one just timed.
+        """
+        if duration is None:
+            duration = self.time[-1]
+        hist = self.history
+        if hist is None:
+            hist = _STORE.get(self.key, self.recent)
+        (failures, calls) = hist.record(error is not None)
 
         if failures:
-            delay = max(min(pow(self.results[-1][0], failures), self.limit),
+            delay = max(min(pow(duration, failures), self.limit),
                         self.min_sleep)
-            logging.warn("min(pow(%.2f, %d), %d) -> %.2f" % (
-                self.results[-1][0], failures, self.limit, delay))
+            logging.warn("min(pow(%.2f, %d), %d) -> %.2f",
+                         duration, failures, self.limit, delay)
         else:
             delay = 0
-        logging.warn(" %s (%d/%d failures)-> Delaying for %.2fs" % (
-            type(error) if error else "Success", failures, len(self.results),
-            delay))
+        logging.warn(" %s (%d/%d failures)-> Delaying for %.2fs",
+                     type(error) if error else "Success", failures,
+                     calls, delay)
 
         return delay
 
-    def __enter__(self):
+    def __enter__(self, instrument=None):
+        if trace.enabled:
+            trace.start('backoff', self)
         self.time = self.timer.__enter__()
 
-    def __exit__(self, type, value, traceback):
+    def __exit__(self, type, value, traceback, instrument=None):
         self.timer.__exit__(type, value, traceback)
-        time.sleep(self.delay(value))
+        delay = self.delay(value)
+        if instrument is not None:
+            instrument.record(self.time[-1], value)
+            instrument.gauge('delay', delay)
+        try:
+            deadline.sleep(delay, 'backoff')
+        finally:
+            if trace.enabled:
+                trace.finish(self, type)
         return False
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Benchmarks for Tillicum.
+
+Run them all, reporting results as JSON, with:
+
+python -m tillicum.bench
+"""
+
+import logging
+from contextlib import contextmanager
+
+
+@contextmanager
+def quiet():
+    """Silence logging, which would otherwise dominate the results."""
+    disabled = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        logging.disable(disabled)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Run all benchmarks, reporting results as JSON."""
+
+import sys
+import json
+
+from tillicum.bench import overhead, scenarios, bulkhead
+
+
+def main():
+    json.dump({'scenarios': scenarios.run(),
+               'overhead': {'policy': overhead.compare(),
+                            'primitives': overhead.primitives()},
+               'bulkhead': bulkhead.compare()},
+              sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+
+if __name__ == '__main__':
+    main()
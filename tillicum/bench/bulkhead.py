@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Show how bulkheads isolate a slow dependency from a fast one.
+
+A pool of worker threads serves requests which are split evenly
+between a slow upstream and a fast one. Without bulkheads, the slow
+requests tie up every worker, and the fast ones queue behind them.
+With a bulkhead around each upstream, at most limit workers wait on
+the slow one; the rest of its calls are shed, and the fast requests
+keep flowing.
+
+Unlike the other benchmarks, this uses real threads and the system
+clock, so it takes a few seconds. Run with:
+
+python -m tillicum.bench.bulkhead
+"""
+
+import sys
+import json
+import threading
+from Queue import Queue
+
+from tillicum import clock
+from tillicum import bulkhead as partitions
+from tillicum.bulkhead import bulkhead, BulkheadFull
+from tillicum.bench import quiet
+from tillicum.bench.scenarios import percentiles
+from tillicum.bench.upstream import Upstream, constant
+
+
+def serve(upstreams, workers, requests, rate, limits=None):
+    """Serve requests with a pool of workers, returning a report.
+
+    Requests alternate between the upstreams, by name, and arrive at
+    rate per second. If limits is given, each upstream gets a bulkhead
+    with the number of slots it maps the upstream's name to, and no
+    queue; a queued caller would still hold up a worker.
+    """
+    calls = dict((name, upstream.call)
+                 for (name, upstream) in upstreams.items())
+    if limits:
+        partitions.clear()
+        calls = dict((name, bulkhead('bench_' + name, limits[name])(call))
+                     for (name, call) in calls.items())
+
+    names = sorted(calls)
+    results = dict((name, {'latencies': [], 'shed': 0}) for name in names)
+    jobs = Queue()
+
+    def worker():
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            (name, queued) = job
+            try:
+                calls[name]()
+            except BulkheadFull:
+                results[name]['shed'] += 1
+            else:
+                results[name]['latencies'].append(clock.now() - queued)
+
+    threads = [threading.Thread(target=worker) for x in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    start = clock.now()
+    for n in xrange(requests):
+        delay = start + n / float(rate) - clock.now()
+        if delay > 0:
+            clock.sleep(delay)
+        jobs.put((names[n % len(names)], clock.now()))
+    for thread in threads:
+        jobs.put(None)
+    for thread in threads:
+        thread.join()
+
+    report = dict((name, {'completed': len(result['latencies']),
+                          'shed': result['shed'],
+                          'latency': percentiles(result['latencies'])})
+                  for (name, result) in results.items())
+    report['duration'] = clock.now() - start
+    return report
+
+
+def compare(workers=8, requests=200, rate=200, slow=0.1, fast=0.001,
+            limit=2):
+    """Compare serving a slow and fast upstream, with and without bulkheads.
+
+    With bulkheads, the slow upstream gets limit slots, and the fast
+    one the rest of the workers.
+    """
+    report = {}
+    with quiet():
+        for (label, limits) in (('shared', None),
+                                ('bulkhead', {'slow': limit,
+                                              'fast': workers - limit})):
+            upstreams = {'slow': Upstream(constant(slow)),
+                         'fast': Upstream(constant(fast))}
+            report[label] = serve(upstreams, workers, requests, rate, limits)
+    return report
+
+
+def main():
+    json.dump(compare(), sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+
+if __name__ == '__main__':
+    main()
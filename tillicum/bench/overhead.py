@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Measure the per-call overhead of Tillicum primitives.
+
+Run with:
+
+python -m tillicum.bench.overhead
+"""
+
+import sys
+import json
+from timeit import Timer
+
+from ostrich import stats
+
+from tillicum.clock import use_clock, VirtualClock
+from tillicum.timer import timer
+from tillicum.retry import retry
+from tillicum.circuit import circuit
+from tillicum.backoff import backoff
+from tillicum.throttle import throttle
+from tillicum.deadline import deadline
+from tillicum.timeout import timeout
+from tillicum.ratelimit import ratelimit
+from tillicum.policy import policy
+from tillicum.bench import quiet
+
+
+def target():
+    """A call with as close to no cost of its own as possible."""
+    return 42
+
+
+def stacked(function):
+    """Wrap function in individually stacked decorators."""
+    return stats.time('stacked_time')(
+        retry(3, exceptions=(ValueError,))(
+            circuit()(
+                backoff()(
+                    throttle(1, error_only=True)(function)))))
+
+
+def compiled(function):
+    """Wrap function in the equivalent compiled policy."""
+    return policy().metrics('compiled').retry(3, exceptions=(ValueError,)) \
+        .circuit().backoff().throttle(1, error_only=True)(function)
+
+
+def per_call(function, number):
+    """Return the best time per call of function, in microseconds."""
+    timer = Timer(function)
+    return min(timer.repeat(3, number)) / number * 1000000
+
+
+def compare(number=10000):
+    """Compare the overhead of stacked decorators and a compiled policy.
+
+    Returns a dict of microseconds per call, including the unwrapped
+    call for reference.
+    """
+    with quiet():
+        return {'bare': per_call(target, number),
+                'stacked': per_call(stacked(target), number),
+                'policy': per_call(compiled(target), number)}
+
+
+def primitives(number=10000):
+    """Measure the overhead of each primitive on its own.
+
+    Sleeps are made on a VirtualClock, so only bookkeeping is
+    measured. Returns a dict of microseconds per call, or per item
+    for ratelimit.
+    """
+    wrappers = {'timer': timer(),
+                'retry': retry(),
+                'circuit': circuit(),
+                'backoff': backoff(),
+                'throttle': throttle(1),
+                'deadline': deadline(60),
+                'timeout': timeout(60)}
+    results = {'bare': per_call(target, number)}
+    with quiet(), use_clock(VirtualClock()):
+        for (name, wrapper) in wrappers.items():
+            results[name] = per_call(wrapper(target), number)
+        results['ratelimit'] = per_call(
+            lambda: list(ratelimit(xrange(number), number)), 1) / number
+    return results
+
+
+def main():
+    json.dump({'policy': compare(), 'primitives': primitives()},
+              sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+
+if __name__ == '__main__':
+    main()
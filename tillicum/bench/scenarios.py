@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Simulate Tillicum primitives against an upstream service.
+
+Each scenario issues a stream of requests to a simulated upstream,
+through one of the primitives, on a VirtualClock. It reports:
+
+- goodput: successful requests per simulated second.
+- amplification: upstream calls per request made.
+- latency: percentiles of the time each request took, in seconds.
+
+Run with:
+
+python -m tillicum.bench.scenarios
+"""
+
+import sys
+import json
+
+from tillicum.clock import use_clock, VirtualClock
+from tillicum.retry import retry
+from tillicum.backoff import backoff
+from tillicum.throttle import throttle
+from tillicum.ratelimit import ratelimit
+from tillicum.policy import policy
+from tillicum.bench import quiet
+from tillicum.bench.upstream import Upstream, lognormal
+
+
+PERCENTILES = (('p50', 50), ('p90', 90), ('p99', 99), ('p999', 99.9))
+
+
+def percentiles(values):
+    """Return the standard percentiles of values, by nearest rank."""
+    values = sorted(values)
+    if not values:
+        return {}
+    result = dict((label, values[min(int(len(values) * p / 100.0),
+                                     len(values) - 1)])
+                  for (label, p) in PERCENTILES)
+    result['max'] = values[-1]
+    return result
+
+
+def simulate(upstream, wrap=None, pace=None, requests=1000, rate=None):
+    """Send requests to upstream, returning a report.
+
+    Each request calls upstream.call, wrapped with wrap if given. If
+    rate is set, requests are issued at that many per second, or as
+    soon as the previous request finishes if that is later. If pace
+    is given, it is applied to the sequence of requests, as with
+    ratelimit.
+    """
+    def request():
+        return upstream.call()
+
+    call = wrap(request) if wrap else request
+    (successes, latencies) = (0, [])
+    with quiet(), use_clock(VirtualClock()) as clock:
+        start = clock.time()
+        seq = xrange(requests)
+        for n in (pace(seq) if pace else seq):
+            if rate:
+                clock.sleep(start + n / float(rate) - clock.time())
+            began = clock.time()
+            try:
+                call()
+                successes += 1
+            except Exception:
+                pass
+            latencies.append(clock.time() - began)
+        duration = clock.time() - start
+
+    return {'requests': requests,
+            'successes': successes,
+            'failures': requests - successes,
+            'duration': duration,
+            'goodput': successes / duration if duration else 0,
+            'upstream_calls': upstream.calls,
+            'amplification': float(upstream.calls) / requests,
+            'latency': percentiles(latencies)}
+
+
+def scenarios():
+    """Return the standard scenarios, as name -> simulate() arguments."""
+    return {'bare': {},
+            'retry': {'wrap': retry()},
+            'backoff': {'wrap': backoff()},
+            'throttle': {'wrap': throttle(1)},
+            'throttle_errors': {'wrap': throttle(1, error_only=True)},
+            'retry_backoff': {'wrap': lambda f: retry()(backoff()(f))},
+            'ratelimit': {'pace': lambda seq: ratelimit(seq, 10)},
+            'policy': {'wrap': policy().retry().circuit().backoff()}}
+
+
+def run(requests=1000, rate=20, latency=None, error_rate=0.05,
+        capacity=50, seed=0):
+    """Run every scenario against identically configured upstreams."""
+    latency = latency or lognormal(0.05)
+    results = {}
+    for (name, kwargs) in scenarios().items():
+        upstream = Upstream(latency, error_rate, capacity, seed)
+        results[name] = simulate(upstream, requests=requests, rate=rate,
+                                 **kwargs)
+    return results
+
+
+def main():
+    json.dump(run(), sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+
+if __name__ == '__main__':
+    main()
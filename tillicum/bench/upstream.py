@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""A simulated upstream service."""
+
+import socket
+import random
+from math import log
+from collections import deque
+
+from tillicum import clock
+
+
+class Overloaded(socket.error):
+
+    """Raised when the upstream is over capacity and sheds a call."""
+
+
+def constant(seconds):
+    """Return a latency distribution which always takes seconds."""
+    return lambda rand: seconds
+
+
+def exponential(mean):
+    """Return an exponential latency distribution."""
+    return lambda rand: rand.expovariate(1.0 / mean)
+
+
+def lognormal(median, sigma=0.5):
+    """Return a log-normal latency distribution, with a long tail."""
+    mu = log(median)
+    return lambda rand: rand.lognormvariate(mu, sigma)
+
+
+class Upstream(object):
+
+    """A service which takes time to respond, and sometimes fails.
+
+    Each call sleeps on the current clock for a latency drawn from
+    latency, then fails with socket.error with probability
+    error_rate. If capacity is set and more calls than that arrived
+    in the last second, the upstream is overloaded: latency grows in
+    proportion to the load, and the excess calls fail with
+    Overloaded.
+
+    Run under a VirtualClock, this simulates any amount of traffic
+    almost instantly.
+    """
+
+    def __init__(self, latency=None, error_rate=0, capacity=None, seed=None):
+        self.latency = latency or constant(0.05)
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.random = random.Random(seed)
+        self.arrivals = deque()
+        self.calls = 0
+        self.errors = 0
+
+    def load(self):
+        """Return the number of calls which arrived in the last second."""
+        now = clock.now()
+        while self.arrivals and self.arrivals[0] <= now - 1:
+            self.arrivals.popleft()
+        return len(self.arrivals)
+
+    def call(self):
+        self.calls += 1
+        self.arrivals.append(clock.now())
+        load = self.load()
+        latency = self.latency(self.random)
+        overload = (float(load) / self.capacity
+                    if self.capacity and load > self.capacity else 0)
+        if overload:
+            latency *= overload
+
+        clock.sleep(latency)
+        if overload and self.random.random() < 1 - 1 / overload:
+            self.errors += 1
+            raise Overloaded("Over capacity at %d calls/s" % load)
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            raise socket.error("Simulated failure")
+        return latency
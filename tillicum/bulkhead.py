@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Isolate dependencies by capping their concurrent calls."""
+
+import heapq
+import logging
+import threading
+from itertools import count
+
+from . import clock, deadline, registry, trace
+from . contextdecorator import ContextDecorator
+from . lazy import lazy_import
+
+stats = lazy_import('ostrich.stats', globals())
+
+_PARTITIONS = {}
+_LOCK = threading.Lock()
+
+
+class BulkheadFull(Exception):
+
+    """Raised when a call is shed instead of waiting for a slot."""
+
+
+class _waiter(object):
+
+    """A caller queued for a slot in a partition."""
+
+    def __init__(self, priority, expires, seq):
+        self.priority = priority
+        self.key = (-priority, expires, seq)
+        self.event = threading.Event()
+        self.granted = False
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class partition(object):
+
+    """A pool of limit slots, with a queue of up to queue waiters.
+
+    Waiters are served highest priority first, then earliest
+    expiration first.
+    """
+
+    def __init__(self, name, limit, queue=0):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.waiting = []
+        self.shed = 0
+        self.lock = threading.Lock()
+        self.seq = count()
+        self.instrument = registry.register('bulkhead', name)
+        self.published = False
+
+    def publish(self):
+        """Register the ostrich gauges, on first use."""
+        self.published = True
+        stats.make_gauge('%s_bulkhead_active' % self.name,
+                         lambda: self.active)
+        stats.make_gauge('%s_bulkhead_queued' % self.name,
+                         lambda: len(self.waiting))
+
+    def update(self):
+        """Update the gauges of the instrument."""
+        self.instrument.gauge('active', self.active)
+        self.instrument.gauge('queued', len(self.waiting))
+
+    def reject(self, reason):
+        """Count a shed call, returning BulkheadFull to raise for it."""
+        self.shed += 1
+        self.instrument.incr('shed')
+        stats.incr('%s_bulkhead_shed' % self.name)
+        logging.debug("Shedding call to %s: %s", self.name, reason)
+        return BulkheadFull("Bulkhead %s shed call: %s" % (self.name, reason))
+
+    def acquire(self, priority=0, wait=None):
+        """Take a slot, waiting up to wait seconds for one.
+
+        Raises BulkheadFull if no slot is free in time, or if the
+        queue is full of callers with at least the same priority.
+        """
+        with self.lock:
+            if not self.published:
+                self.publish()
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                self.update()
+                return
+            if not self.queue or (wait is not None and wait <= 0):
+                raise self.reject("%d calls active" % self.active)
+
+            expires = clock.now() + wait if wait is not None else float('inf')
+            waiter = _waiter(priority, expires, next(self.seq))
+            if len(self.waiting) >= self.queue:
+                # Only priority decides who is displaced; expiry only
+                # orders the queue.
+                lowest = max(self.waiting)
+                if priority <= lowest.priority:
+                    raise self.reject("queue full")
+                self.waiting.remove(lowest)
+                heapq.heapify(self.waiting)
+                lowest.event.set()
+            heapq.heappush(self.waiting, waiter)
+            self.update()
+
+        if trace.enabled:
+            with trace.span('wait', reason='bulkhead', partition=self.name):
+                waiter.event.wait(wait)
+        else:
+            waiter.event.wait(wait)
+        with self.lock:
+            if waiter.granted:
+                return
+            if waiter in self.waiting:
+                self.waiting.remove(waiter)
+                heapq.heapify(self.waiting)
+                self.update()
+                raise self.reject("no slot within %.2fs" % wait)
+            raise self.reject("displaced by a higher priority call")
+
+    def release(self):
+        """Give up a slot, handing it to the next waiter."""
+        with self.lock:
+            if self.waiting:
+                waiter = heapq.heappop(self.waiting)
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self.active -= 1
+            self.update()
+
+
+def get_partition(name, limit=10, queue=0):
+    """Return the partition called name, creating it if needed.
+
+    The limit and queue size are only used when it's created.
+    """
+    part = _PARTITIONS.get(name)
+    if part is None:
+        with _LOCK:
+            part = _PARTITIONS.get(name)
+            if part is None:
+                part = _PARTITIONS[name] = partition(name, limit, queue)
+    return part
+
+
+def clear():
+    """Forget every partition."""
+    with _LOCK:
+        _PARTITIONS.clear()
+
+
+class bulkhead(ContextDecorator):
+
+    """Cap the concurrent calls to a dependency.
+
+    Calls sharing a name share a partition of limit slots, so a slow
+    dependency can tie up at most limit threads. When every slot is
+    taken, up to queue callers wait for one, highest priority first;
+    the rest are shed at once by raising BulkheadFull. A caller of
+    higher priority than one already queued takes its place in a full
+    queue, shedding it.
+
+    Callers wait at most timeout seconds for a slot, and never beyond
+    their deadline.
+
+    @bulkhead('geocoder', limit=4, queue=8, timeout=0.5)
+    def geocode(address):
+        pass
+    """
+
+    def __init__(self, name, limit=10, queue=0, priority=0, timeout=None):
+        self.partition = get_partition(name, limit, queue)
+        self.priority = priority
+        self.timeout = timeout
+
+    def __enter__(self):
+        wait = self.timeout
+        left = deadline.remaining()
+        if left is not None:
+            wait = left if wait is None else min(wait, left)
+        self.partition.acquire(self.priority, wait)
+
+    def __exit__(self, type, value, traceback):
+        self.partition.release()
+        return False
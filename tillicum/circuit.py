@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Stop calling a service which keeps failing."""
+
+import logging
+
+from . import clock
+from . contextdecorator import ContextDecorator
+
+
+class CircuitOpen(Exception):
+
+    """Raised instead of calling a service while its circuit is open."""
+
+
+class circuit(ContextDecorator):
+
+    """Break the circuit to a service after repeated failures.
+
+    After threshold consecutive exceptions listed in exceptions, the
+    circuit opens, and the wrapped code is not run; CircuitOpen is
+    raised instead. After reset seconds, calls are let through again.
+    A success closes the circuit, while another failure reopens it
+    immediately.
+
+    This can be used either as a decorator or context manager.
+    """
+
+    instrumented = True
+
+    def __init__(self, threshold=5, reset=30, exceptions=None):
+        self.threshold = threshold
+        self.reset = reset
+        self.exceptions = exceptions or (Exception,)
+        self.failures = 0
+        self.opened = None
+
+    def allow(self):
+        """Raise CircuitOpen unless calls may be made."""
+        if (self.opened is not None
+            and clock.now() - self.opened < self.reset):
+            raise CircuitOpen("Circuit open after %d failures" % (
+                    self.failures))
+
+    def record(self, error=None):
+        """Record the outcome of a call."""
+        if error is None or not isinstance(error, self.exceptions):
+            self.failures = 0
+            self.opened = None
+            return
+
+        self.failures += 1
+        if self.opened is not None or self.failures >= self.threshold:
+            if self.opened is None:
+                logging.warn("Opening circuit after %d failures",
+                             self.failures)
+            self.opened = clock.now()
+
+    def __enter__(self, instrument=None):
+        self.allow()
+
+    def __exit__(self, type, value, traceback, instrument=None):
+        self.record(value)
+        if instrument is not None:
+            instrument.record(error=value)
+            instrument.gauge('open', self.opened is not None)
+        return False
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Clocks for measuring time and sleeping.
+
+All of Tillicum's timing and pacing goes through the current clock,
+which is the system clock unless another has been installed:
+
+from tillicum import clock
+clock.now()       # -> Current time, in seconds since the epoch
+clock.sleep(1)    # -> Sleep for 1s
+
+The clock is process-wide, not per-thread.
+"""
+
+import time
+
+from . contextdecorator import ContextDecorator
+
+
+class SystemClock(object):
+
+    """Measure time with, and sleep on, the system clock."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class PreciseClock(SystemClock):
+
+    """A system clock which sleeps more precisely.
+
+    time.sleep() wakes up late, by an amount which depends on the OS
+    and load; this matters when pacing at sub-millisecond
+    intervals. This clock keeps a moving average of the overshoot,
+    sleeps for that much less than asked, then spins until the
+    requested time has passed. When the estimate leaves nothing to
+    sleep for, it decays, so one slow wakeup doesn't leave every later
+    sleep spinning.
+    """
+
+    def __init__(self, weight=0.1):
+        self.weight = weight
+        self.overshoot = 0
+
+    def sleep(self, seconds):
+        end = time.time() + seconds
+        coarse = seconds - self.overshoot
+        if coarse > 0:
+            start = time.time()
+            time.sleep(coarse)
+            over = max(time.time() - start - coarse, 0)
+            self.overshoot += self.weight * (over - self.overshoot)
+        else:
+            self.overshoot -= self.weight * self.overshoot
+
+        while time.time() < end:
+            pass
+
+
+class VirtualClock(object):
+
+    """A deterministic clock, which only moves when slept on.
+
+    Sleeping returns immediately, having advanced the clock. This
+    allows tests and simulations to run hours of activity in
+    milliseconds.
+    """
+
+    def __init__(self, start=0):
+        self.now = float(start)
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 0)
+
+    advance = sleep
+
+
+_CLOCK = SystemClock()
+now = _CLOCK.time
+sleep = _CLOCK.sleep
+
+
+def get_clock():
+    """Return the current clock."""
+    return _CLOCK
+
+
+def set_clock(clock):
+    """Install clock as the current clock, returning the old one."""
+    global _CLOCK, now, sleep
+    (old, _CLOCK) = (_CLOCK, clock)
+    (now, sleep) = (clock.time, clock.sleep)
+    return old
+
+
+class use_clock(ContextDecorator):
+
+    """Use a clock for the duration of the wrapped code.
+
+    with use_clock(VirtualClock()) as clock:
+        clock.advance(60)
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.old = []
+
+    def __enter__(self):
+        self.old.append(set_clock(self.clock))
+        return self.clock
+
+    def __exit__(self, type, value, traceback):
+        set_clock(self.old.pop())
+        return False
@@ -6,17 +6,51 @@
 
 """Context manager & decorator support code."""
 
+import sys
 from functools import wraps
 
+from . import registry
+
 class ContextDecorator(object):
 
-    """Make a context manager class a decorator."""
+    """Make a context manager class a decorator.
+
+    If instrumented is set, decorating a function registers an
+    instrument for it with tillicum.registry. The decorator passes
+    it to the context manager as an extra argument to __enter__ and
+    __exit__, so one manager can decorate several functions.
+    """
+
+    instrumented = False
+
+    def register(self, function):
+        """Return an instrument for function, if instrumented."""
+        if self.instrumented:
+            return registry.register(type(self).__name__, function)
 
     def __call__(self, function):
         """Act as a decorator."""
+        instrument = self.register(function)
+        if instrument is None:
+            @wraps(function)
+            def __inner__(*args, **kwargs):
+                with self:
+                    return function(*args, **kwargs)
+
+            return __inner__
+
         @wraps(function)
         def __inner__(*args, **kwargs):
-            with self:
-                return function(*args, **kwargs)
+            self.__enter__(instrument)
+            try:
+                retval = function(*args, **kwargs)
+            except:
+                exc_info = sys.exc_info()
+                if not self.__exit__(exc_info[0], exc_info[1], exc_info[2],
+                                     instrument):
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                return None
+            self.__exit__(None, None, None, instrument)
+            return retval
 
         return __inner__
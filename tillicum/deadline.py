@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Bound the total time spent in a block of code."""
+
+import threading
+
+from . import clock, trace
+from . contextdecorator import ContextDecorator
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+
+    """Raised when the time budget for a block has been spent."""
+
+
+class deadline(ContextDecorator):
+
+    """Give a block of code a time budget of seconds.
+
+    The budget is tracked per-thread, and every Tillicum primitive
+    called within the block respects it: retry stops retrying, and
+    backoff, throttle and ratelimit cut their delays short, raising
+    DeadlineExceeded once the budget is spent.
+
+    Deadlines nest, but an inner deadline can never extend an outer
+    one; the earliest expiration always wins.
+
+    with deadline(5):
+        talk()
+
+    @deadline(5)
+    def talk():
+        pass
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault('stack', [])
+        expires = clock.now() + self.seconds
+        if stack:
+            expires = min(expires, stack[-1])
+        stack.append(expires)
+
+    def __exit__(self, type, value, traceback):
+        _local.stack.pop()
+        return False
+
+
+def remaining():
+    """Return the seconds left in the current budget, or None."""
+    stack = getattr(_local, 'stack', None)
+    if not stack:
+        return None
+    return stack[-1] - clock.now()
+
+
+def check():
+    """Raise DeadlineExceeded if the current budget is spent."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Deadline exceeded by %.2fs" % -left)
+
+
+def sleep(seconds, reason=None):
+    """Sleep for seconds, without overrunning the current budget.
+
+    If the budget runs out before seconds have passed, sleep only
+    until it does, then raise DeadlineExceeded. When tracing, the
+    sleep is a span tagged with the reason for it.
+    """
+    if trace.enabled and seconds > 0:
+        with trace.span('sleep', reason=reason, seconds=seconds):
+            _sleep(seconds)
+    else:
+        _sleep(seconds)
+
+
+def _sleep(seconds):
+    """Sleep for seconds, or until the current budget runs out."""
+    left = remaining()
+    if left is not None and seconds > 0 and seconds > left:
+        if left > 0:
+            clock.sleep(left)
+        raise DeadlineExceeded(
+            "Deadline exceeded; %.2fs delay cut short" % seconds)
+    clock.sleep(seconds)
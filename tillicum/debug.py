@@ -4,13 +4,28 @@
 # Author: Ian Eure <ian@simplegeo.com>
 #
 
-"""Interactive debugging."""
+"""Interactive debugging and profiling."""
 
-import pdb
+import os
+import sys
+import time
 import signal
+import logging
+import threading
+from itertools import count
 from functools import wraps
+from operator import itemgetter
+from collections import defaultdict
 
 from . contextdecorator import ContextDecorator
+from . lazy import lazy_import
+
+pdb = lazy_import('pdb', globals())
+tempfile = lazy_import('tempfile', globals())
+snapshot = lazy_import('tillicum.snapshot', globals())
+
+# Numbers profiles, so those started in the same second don't clash.
+_profiles = count(1)
 
 class debug_on_exception(ContextDecorator):
 
@@ -36,6 +51,52 @@ class debug_on_exception(ContextDecorator):
         return False
 
 
+class snapshot_on_exception(debug_on_exception):
+
+    """Write a post-mortem snapshot when an unhandled exception is raised.
+
+    Unlike debug_on_exception, this doesn't block, so it's safe to
+    use in unattended processes. The snapshot records the traceback,
+    with truncated locals, and the stacks of all threads; see
+    tillicum.snapshot.capture for the limits. It's written to
+    directory, and can be browsed later with:
+
+    python -m tillicum.snapshot FILE
+
+    At most one snapshot is written per interval seconds for each
+    type of exception, so a storm of errors doesn't become a storm of
+    disk writes.
+    """
+
+    def __init__(self, exceptions=(), directory=None, interval=60,
+                 **limits):
+        debug_on_exception.__init__(self, exceptions)
+        self.directory = directory or tempfile.gettempdir()
+        self.interval = interval
+        self.limits = limits
+        self.written = {}
+
+    def __exit__(self, type, value, traceback):
+        if type is None or not issubclass(type, tuple(self.exceptions)):
+            return False
+
+        now = time.time()
+        if now - self.written.get(type, -self.interval) < self.interval:
+            return False
+        self.written[type] = now
+
+        path = os.path.join(self.directory, "tillicum-snapshot-%d-%d-%s.gz" % (
+                os.getpid(), now, type.__name__))
+        try:
+            snapshot.save(snapshot.capture(type, value, traceback,
+                                           **self.limits), path)
+            logging.warn("Wrote snapshot of %s to %s", type.__name__, path)
+        except Exception:
+            logging.exception("Couldn't write snapshot to %s", path)
+
+        return False
+
+
 class _let_signal(object):
 
     """Temporarily change a signal handler."""
@@ -65,3 +126,118 @@ class debug_on_signal(_let_signal, debug_on_exception):
 
     def _handler(self, signum, frame):
         self.get_debugger().set_trace(frame)
+
+
+def _label(code):
+    """Return a label for a code object, in the style of pstats."""
+    return "%s:%d(%s)" % (code.co_filename, code.co_firstlineno,
+                          code.co_name)
+
+
+class _sampler(threading.Thread):
+
+    """Periodically sample the stacks of all other threads."""
+
+    def __init__(self, rate):
+        threading.Thread.__init__(self, name="tillicum-sampler")
+        self.daemon = True
+        self.interval = 1.0 / rate
+        self.stacks = defaultdict(int)
+        self.samples = 0
+        self.running = True
+        self.started = time.time()
+        self.stopped = None
+
+    def run(self):
+        while self.running:
+            time.sleep(self.interval)
+            self.sample()
+
+    def sample(self):
+        """Record the current stack of every other thread."""
+        for (ident, frame) in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def stop(self):
+        self.running = False
+        self.stopped = time.time()
+        self.join()
+
+    def write_collapsed(self, output):
+        """Write stacks in the collapsed format used by flamegraph.pl."""
+        lines = ("%s %d\n" % (";".join(map(_label, stack)), count)
+                 for (stack, count) in self.stacks.items())
+        output.writelines(sorted(lines))
+
+    def write_report(self, output, top=20):
+        """Write a report of the top functions by samples."""
+        total = float(sum(self.stacks.values())) or 1
+        own = defaultdict(int)
+        cumulative = defaultdict(int)
+        for (stack, count) in self.stacks.items():
+            own[stack[-1]] += count
+            for code in set(stack):
+                cumulative[code] += count
+
+        output.write("%d samples in %.2fs\n" % (
+                self.samples, (self.stopped or time.time()) - self.started))
+        output.write("%8s %8s  %s\n" % ("self%", "total%", "function"))
+        for (code, count) in sorted(own.items(), key=itemgetter(1),
+                                    reverse=True)[:top]:
+            output.write("%7.2f%% %7.2f%%  %s\n" % (
+                    count / total * 100, cumulative[code] / total * 100,
+                    _label(code)))
+
+
+class profile_on_signal(_let_signal, ContextDecorator):
+
+    """Profile this process when it receives a signal.
+
+    The first signal starts sampling the stacks of every thread rate
+    times per second, which bounds the overhead. The second stops
+    sampling, and writes the stacks in collapsed format for
+    flamegraph.pl to path-TIMESTAMP-N.folded, and a report of the top
+    functions by samples to path-TIMESTAMP-N.txt, where N numbers the
+    profiles taken by this process. Further signals start and stop new
+    profiles.
+    """
+
+    def __init__(self, signalnum, path=None, rate=100, top=20):
+        _let_signal.__init__(self, signalnum, self._handler)
+        self.path = path or "tillicum-profile-%d" % os.getpid()
+        self.rate = rate
+        self.top = top
+        self.sampler = None
+
+    def __exit__(self, type, value, traceback):
+        _let_signal.__exit__(self, type, value, traceback)
+        if self.sampler is not None:
+            self.dump()
+        return False
+
+    def _handler(self, signum, frame):
+        if self.sampler is None:
+            self.sampler = _sampler(self.rate)
+            self.sampler.start()
+        else:
+            self.dump()
+
+    def dump(self):
+        """Stop sampling, and write out the profile."""
+        (sampler, self.sampler) = (self.sampler, None)
+        sampler.stop()
+        prefix = "%s-%d-%d" % (self.path, sampler.started, next(_profiles))
+        with open(prefix + ".folded", "w") as output:
+            sampler.write_collapsed(output)
+        with open(prefix + ".txt", "w") as output:
+            sampler.write_report(output, self.top)
+        logging.warn("Wrote profile of %d samples to %s.{folded,txt}",
+                     sampler.samples, prefix)
+        return prefix
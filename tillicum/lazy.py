@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Defer imports until first use."""
+
+from importlib import import_module
+
+
+class lazy_import(object):
+
+    """A placeholder for a module, which imports it when first used.
+
+    stats = lazy_import('ostrich.stats', globals())
+
+    The first time an attribute of the placeholder is used, the module
+    is imported. If a namespace was given, the module replaces the
+    placeholder in it, so later uses cost nothing extra.
+    """
+
+    def __init__(self, name, namespace=None, alias=None):
+        self._name = name
+        self._namespace = namespace
+        self._alias = alias or name.rsplit('.', 1)[-1]
+        self._module = None
+
+    def _load(self):
+        """Import the module, returning it."""
+        if self._module is None:
+            self._module = import_module(self._name)
+            if (self._namespace is not None
+                and self._namespace.get(self._alias) is self):
+                self._namespace[self._alias] = self._module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return "<lazy module %r>" % self._name
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Compose resilience tools into a single wrapper."""
+
+import sys
+import socket
+import logging
+from functools import wraps
+
+from . import clock, deadline, registry, trace
+from . backoff import backoff
+from . circuit import circuit
+from . timeout import timeout, Timeout
+from . lazy import lazy_import
+
+stats = lazy_import('ostrich.stats', globals())
+
+
+class policy(object):
+
+    """Build a wrapper combining several Tillicum tools.
+
+    Stacking decorators runs every call through a frame and context
+    manager per layer. A policy is configured once, then compiled
+    into a single wrapper which does the same work inline:
+
+    @policy().retry(3).circuit(5, 30).backoff(limit=60).metrics('talk')
+    def talk():
+        pass
+
+    Regardless of the order in which they are configured, the layers
+    behave as if stacked in this order, outermost first:
+
+    @deadline()
+    @metrics
+    @retry()
+    @circuit()
+    @backoff()
+    @throttle()
+    @timeout()
+    def talk():
+        pass
+
+    When retrying, attempts which time out are always retried.
+
+    When tracing, each call is a span, with each attempt and delay as
+    a child.
+    """
+
+    def __init__(self):
+        self._deadline = None
+        self._retry = None
+        self._circuit = None
+        self._backoff = None
+        self._throttle = None
+        self._timeout = None
+        self._metrics = None
+
+    def deadline(self, seconds):
+        """Give each call a total budget of seconds."""
+        self._deadline = seconds
+        return self
+
+    def retry(self, max_=3, exceptions=None):
+        """Retry calls, as tillicum.retry.retry."""
+        self._retry = (max_, exceptions or (socket.error, socket.timeout))
+        return self
+
+    def circuit(self, *args, **kwargs):
+        """Break the circuit, as tillicum.circuit.circuit."""
+        self._circuit = (args, kwargs)
+        return self
+
+    def backoff(self, *args, **kwargs):
+        """Back off as errors occur, as tillicum.backoff.backoff."""
+        self._backoff = (args, kwargs)
+        return self
+
+    def throttle(self, factor, error_only=False):
+        """Throttle calls, as tillicum.throttle.throttle."""
+        self._throttle = (factor, error_only)
+        return self
+
+    def timeout(self, seconds):
+        """Limit each attempt to seconds, as tillicum.timeout.timeout."""
+        self._timeout = seconds
+        return self
+
+    def metrics(self, name=None):
+        """Count and time calls in ostrich, under name.
+
+        The name defaults to that of the wrapped function.
+        """
+        self._metrics = (name,)
+        return self
+
+    def __call__(self, function):
+        """Compile the policy into a wrapper for function."""
+        budget = (deadline.deadline(self._deadline)
+                  if self._deadline is not None else None)
+        (max_, exceptions) = self._retry or (1, ())
+        if not isinstance(exceptions, tuple):
+            exceptions = (exceptions,)
+        guard = (timeout(self._timeout)
+                 if self._timeout is not None else None)
+        if guard is not None and self._retry:
+            exceptions += (Timeout,)
+        breaker = circuit(*self._circuit[0], **self._circuit[1]) \
+            if self._circuit else None
+        backer = backoff(*self._backoff[0], **self._backoff[1]) \
+            if self._backoff else None
+        (factor, error_only) = self._throttle or (0, False)
+        if self._metrics:
+            name = self._metrics[0] or function.__name__
+            calls_key = '%s_calls' % name
+            errors_key = '%s_errors' % name
+            time_key = '%s_time' % name
+        else:
+            name = None
+        retry_name = name or str(function)
+        settles = breaker or backer or factor
+        instrument = registry.register('policy', function)
+
+        def settle(error, duration):
+            """Record the outcome of an attempt, and delay if needed."""
+            if breaker is not None:
+                breaker.record(error)
+                instrument.gauge('open', breaker.opened is not None)
+            if backer is not None:
+                delay = backer.delay(error, duration)
+                instrument.gauge('delay', delay)
+                if delay > 0:
+                    deadline.sleep(delay, 'backoff')
+            if factor and (error is not None or not error_only):
+                deadline.sleep(factor * duration, 'throttle')
+
+        @wraps(function)
+        def __inner__(*args, **kwargs):
+            if budget is not None:
+                budget.__enter__()
+            start = clock.now()
+            attempts = 1
+            error = None
+            span = (trace.start('policy', function=instrument.name)
+                    if trace.enabled else None)
+            try:
+                while True:
+                    if breaker is not None:
+                        breaker.allow()
+                    began = clock.now()
+                    attempt = (trace.start('attempt', attempt=attempts)
+                               if span is not None else None)
+                    try:
+                        if guard is not None:
+                            with guard:
+                                retval = function(*args, **kwargs)
+                        else:
+                            retval = function(*args, **kwargs)
+                    except Exception, ex:
+                        if attempt is not None:
+                            attempt.finish(ex)
+                        if settles:
+                            settle(ex, clock.now() - began)
+                        if not isinstance(ex, exceptions):
+                            raise
+                        stats.incr('%s_retry' % retry_name)
+                        instrument.incr('retries')
+                        logging.warn("Caught %s on %s attempt %d/%d",
+                                     repr(ex), retry_name, attempts, max_)
+                        if max_ != -1 and attempts >= max_:
+                            logging.exception(
+                                "Retries of %s exceeded, giving up.",
+                                retry_name)
+                            stats.incr('%s_retry_failure' % retry_name)
+                            raise
+                        deadline.check()
+                        attempts += 1
+                        continue
+                    except:
+                        if attempt is not None:
+                            attempt.finish(sys.exc_info()[0])
+                        raise
+
+                    if attempt is not None:
+                        attempt.finish()
+                    if settles:
+                        settle(None, clock.now() - began)
+                    return retval
+            except:
+                error = sys.exc_info()[1]
+                if name is not None:
+                    stats.incr(errors_key)
+                raise
+            finally:
+                if span is not None:
+                    span.finish(error)
+                instrument.record(clock.now() - start, error)
+                if name is not None:
+                    stats.incr(calls_key)
+                    stats.add_timing(time_key,
+                                     int((clock.now() - start) * 1000))
+                if budget is not None:
+                    budget.__exit__(None, None, None)
+
+        return __inner__
@@ -6,15 +6,61 @@
 
 """Rate-limit."""
 
-import time
+from . import clock, deadline
 
-def ratelimit(sequence, ns):
-    """Rate-limit consumption of sequence to n per second."""
-    avg = 0
-    for (n, elt) in enumerate(sequence, 1):
-        start = time.time()
+
+def _coster(cost):
+    """Return a function which weighs an item."""
+    if cost is None:
+        return lambda elt: 1
+    if cost == 'bytes':
+        return len
+    if callable(cost):
+        return cost
+    raise ValueError("cost must be None, 'bytes' or callable, not %r" % cost)
+
+
+def ratelimit(sequence, ns, cost=None, burst=None):
+    """Rate-limit consumption of sequence to n per second.
+
+    By default, every item counts as one. To limit the total weight
+    per second, pass a cost function which weighs each item, or
+    'bytes' to weigh them by length.
+
+    After a pause, burst units may be consumed without delay; the
+    item after them waits. By default there is no burst, and each
+    item is paced as it's consumed. An item heavier than the burst
+    is never held back, but delays those after it until the rate is
+    made up.
+    """
+    weigh = _coster(cost)
+    # Each item is paid for after it's consumed, so the debt allowed
+    # before the next item waits is one unit less than the burst.
+    tolerance = max(float(burst or 0) - 1, 0) / ns
+    tat = 0
+    for elt in sequence:
+        start = clock.now()
         yield elt
-        avg = (avg * (n - 1) + (time.time() - start)) / n
-        sleep = (1 - avg * ns) / ns
+        tat = max(tat, start) + float(weigh(elt)) / ns
+        sleep = tat - tolerance - clock.now()
         if sleep > 0:
-            time.sleep(sleep)
+            deadline.sleep(sleep, 'ratelimit')
+
+
+def chunked(sequence, weight, cost=None):
+    """Regroup sequence into lists weighing at most weight.
+
+    Items are weighed as by ratelimit(). An item heavier than weight
+    is yielded in a list of its own.
+    """
+    weigh = _coster(cost)
+    chunk, total = [], 0
+    for elt in sequence:
+        size = weigh(elt)
+        if chunk and total + size > weight:
+            yield chunk
+            chunk, total = [], 0
+        chunk.append(elt)
+        total += size
+    if chunk:
+        yield chunk
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Live statistics for every instrumented function in the process.
+
+Tillicum's primitives register an instrument here when they decorate
+a function, and update it as it's called. To see what's hot, slow or
+failing right now:
+
+from tillicum import registry
+registry.snapshot()
+
+Or serve snapshots as JSON, over HTTP or a Unix socket:
+
+registry.serve(('localhost', 8642))
+registry.serve('/var/run/myapp/tillicum.sock')
+
+Nothing here takes a lock when updating or reading statistics.
+Updates are plain writes under the GIL, so under heavy contention a
+few counts may be lost, but readers never slow down callers.
+"""
+
+import threading
+from weakref import WeakKeyDictionary, WeakValueDictionary
+from collections import deque
+
+from . lazy import lazy_import
+
+json = lazy_import('json', globals())
+
+_INSTRUMENTS = {}  # (kind, name) -> instrument, for names
+_FUNCTIONS = {}    # kind -> {function: instrument}
+_STRONG = {}       # kind -> {function: instrument}, if not weakrefable
+_NAMES = {}        # kind -> {name: instrument}, for every live instrument
+_LOCK = threading.Lock()
+
+
+class instrument(object):
+
+    """Statistics for one instrumented function or sequence.
+
+    Latency is tracked over the last window calls.
+    """
+
+    def __init__(self, kind, name, window=1000):
+        self.kind = kind
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+        self.counters = {}
+        self.gauges = {}
+
+    def record(self, duration=None, error=None):
+        """Record a call, which took duration seconds."""
+        self.calls += 1
+        if error is not None:
+            self.errors += 1
+        if duration is not None:
+            self.latencies.append(duration)
+
+    def incr(self, name, count=1):
+        """Increment a counter."""
+        self.counters[name] = self.counters.get(name, 0) + count
+
+    def gauge(self, name, value):
+        """Set a gauge to its current value."""
+        self.gauges[name] = value
+
+    def snapshot(self):
+        """Return the current statistics, as a dict."""
+        latencies = sorted(list(self.latencies))
+        result = {'calls': self.calls,
+                  'errors': self.errors,
+                  'counters': dict(self.counters),
+                  'gauges': dict(self.gauges)}
+        if latencies:
+            count = len(latencies)
+            result['latency'] = {
+                'window': count,
+                'mean': sum(latencies) / count,
+                'p50': latencies[count // 2],
+                'p90': latencies[int(count * .9)],
+                'p99': latencies[int(count * .99)],
+                'max': latencies[-1]}
+        return result
+
+
+def _name(target):
+    """Return the name to register target under."""
+    return "%s.%s" % (getattr(target, '__module__', None),
+                      getattr(target, '__name__', repr(target)))
+
+
+def _create(kind, name):
+    """Create an instrument, with a name unique among those of kind.
+
+    Call with _LOCK held.
+    """
+    names = _NAMES.setdefault(kind, WeakValueDictionary())
+    unique = name
+    n = 1
+    while unique in names:
+        n += 1
+        unique = "%s#%d" % (name, n)
+    inst = names[unique] = instrument(kind, unique)
+    return inst
+
+
+def register(kind, target):
+    """Return the instrument for target, creating it if needed.
+
+    Target is either a name, whose instrument is shared by everything
+    registering it, or a function, which gets an instrument of its
+    own. If another function of the same name is registered, the
+    instrument's name has a number appended. A function's instrument
+    is forgotten when the function is.
+    """
+    if isinstance(target, basestring):
+        key = (kind, target)
+        inst = _INSTRUMENTS.get(key)
+        if inst is None:
+            with _LOCK:
+                inst = _INSTRUMENTS.get(key)
+                if inst is None:
+                    inst = _INSTRUMENTS[key] = _create(kind, target)
+        return inst
+
+    with _LOCK:
+        functions = _FUNCTIONS.setdefault(kind, WeakKeyDictionary())
+        try:
+            inst = functions.get(target)
+        except TypeError:
+            # Not weakly referenceable, so keep it for good.
+            functions = _STRONG.setdefault(kind, {})
+            inst = functions.get(target)
+        if inst is None:
+            inst = functions[target] = _create(kind, _name(target))
+        return inst
+
+
+def create(kind, name):
+    """Return a new instrument, for something which isn't a function.
+
+    As for functions, its name has a number appended if it's taken,
+    and it's forgotten when nothing refers to it.
+    """
+    with _LOCK:
+        return _create(kind, name)
+
+
+def snapshot():
+    """Return the statistics of every instrument, by kind and name."""
+    result = {}
+    for (kind, names) in _NAMES.items():
+        stats = dict((name, inst.snapshot())
+                     for (name, inst) in names.items())
+        if stats:
+            result[kind] = stats
+    return result
+
+
+def clear():
+    """Forget every instrument."""
+    with _LOCK:
+        _INSTRUMENTS.clear()
+        _FUNCTIONS.clear()
+        _STRONG.clear()
+        _NAMES.clear()
+
+
+def serve(address):
+    """Serve snapshots as JSON from a background thread.
+
+    If address is a (host, port) tuple, snapshots are served over
+    HTTP; if it's a string, it's the path of a Unix socket which
+    writes a snapshot to every connection. Returns the server, which
+    can be stopped with its shutdown() method.
+    """
+    if isinstance(address, basestring):
+        import SocketServer
+
+        class handler(SocketServer.StreamRequestHandler):
+            def handle(self):
+                self.wfile.write(json.dumps(snapshot()) + "\n")
+
+        server = SocketServer.UnixStreamServer(address, handler)
+    else:
+        import BaseHTTPServer
+
+        class handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(snapshot())
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = BaseHTTPServer.HTTPServer(address, handler)
+
+    thread = threading.Thread(target=server.serve_forever,
+                              name="tillicum-registry")
+    thread.daemon = True
+    thread.start()
+    return server
@@ -6,11 +6,15 @@
 
 """Retry an operation."""
 
+import sys
 import logging
 import socket
+from functools import wraps
 
-from decorator import decorator
-from ostrich import stats
+from . import clock, deadline, registry, trace
+from . lazy import lazy_import
+
+stats = lazy_import('ostrich.stats', globals())
 
 def retry(max_=3, exceptions=None):
     """Retry a function up to max_ times before giving up.
@@ -26,26 +30,67 @@ def retry(max_=3, exceptions=None):
     as failed segments will not be retried. Instead, create an outer
     loop which materializes segments into lists or tuples, and pass
     those.
+
+    No further attempts are made once the current deadline has passed;
+    DeadlineExceeded is raised instead.
+
+    When tracing, each call is a span, with each attempt as a child.
     """
     exceptions = exceptions or (socket.error, socket.timeout)
 
-    @decorator
-    def __wrapper__(func, *args, **kwargs):
-        attempts = 1
-        while True:
-            try:
-                return func(*args, **kwargs)
-            except exceptions, ex:
-                stats.incr('%s_retry' % str(func))
-                logging.warn("Caught %s on %s attempt %d/%d",
-                              repr(ex), str(func), attempts, max_)
-                if max_ != -1 and attempts < max_:
-                    attempts += 1
-                    continue
-
-                logging.exception("Retries of %s exceeded, giving up.",
-                                  str(func))
-                stats.incr('%s_retry_failure' % str(func))
-                raise
-
-    return __wrapper__
+    def __decorate__(func):
+        instrument = registry.register('retry', func)
+
+        @wraps(func)
+        def __wrapper__(*args, **kwargs):
+            attempts = 1
+            start = clock.now()
+            span = (trace.start('retry', function=instrument.name)
+                    if trace.enabled else None)
+            while True:
+                attempt = (trace.start('attempt', attempt=attempts)
+                           if span is not None else None)
+                try:
+                    retval = func(*args, **kwargs)
+                except exceptions, ex:
+                    if attempt is not None:
+                        attempt.finish(ex)
+                    stats.incr('%s_retry' % str(func))
+                    instrument.incr('retries')
+                    logging.warn("Caught %s on %s attempt %d/%d",
+                                  repr(ex), str(func), attempts, max_)
+                    if max_ != -1 and attempts < max_:
+                        try:
+                            deadline.check()
+                        except deadline.DeadlineExceeded, ex:
+                            instrument.record(clock.now() - start, ex)
+                            if span is not None:
+                                span.finish(ex)
+                            raise
+                        attempts += 1
+                        continue
+
+                    logging.exception("Retries of %s exceeded, giving up.",
+                                      str(func))
+                    stats.incr('%s_retry_failure' % str(func))
+                    instrument.record(clock.now() - start, ex)
+                    if span is not None:
+                        span.finish(ex)
+                    raise
+                except:
+                    error = sys.exc_info()[1]
+                    if attempt is not None:
+                        attempt.finish(error)
+                        span.finish(error)
+                    instrument.record(clock.now() - start, error)
+                    raise
+
+                if attempt is not None:
+                    attempt.finish()
+                    span.finish()
+                instrument.record(clock.now() - start)
+                return retval
+
+        return __wrapper__
+
+    return __decorate__
@@ -14,8 +14,7 @@ from datetime import timedelta
 from functools import partial
 from itertools import cycle
 
-import ostrich.stats
-from ostrich.stats_provider import Timer
+from . import registry
 
 INF = float('Inf')
 
@@ -40,9 +39,12 @@ def seqtimer(seq, name=None, interval=None, items=None, length=None,
     file-like object.
     """
 
+    from ostrich.stats import Stats
+    from ostrich.stats_provider import Timer
+
     output = output or sys.stderr
     prefix = name + '_' if name else ""
-    stats = ostrich.stats.Stats()
+    stats = Stats()
     timer_name = "%sitem_time" % prefix
     timing = stats.get_timing(timer_name)
     timer = Timer(stats, "%sitem_time" % prefix)
@@ -52,9 +54,14 @@ def seqtimer(seq, name=None, interval=None, items=None, length=None,
     seq_len = len(seq) if hasattr(seq, '__len__') else length or INF
     start = time.time()
     dump = partial(dump_stats, output, name, timing, seq_len, start)
+    instrument = registry.create('seqtimer', name or 'seqtimer')
+    instrument.gauge('started', start)
+    instrument.gauge('length', seq_len if seq_len < INF else None)
     for item in seq:
         with timer:
             yield item
+        instrument.record(timer.duration())
+        instrument.gauge('items', timing.count)
 
         # Periodically print stats.
         if ((interval and
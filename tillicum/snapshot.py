@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Post-mortem snapshots of exceptions.
+
+A snapshot records the traceback of an exception, with the locals of
+each frame, and the stacks of all threads, in a compact file which
+can be examined later. Browse one with:
+
+python -m tillicum.snapshot FILE
+"""
+
+import os
+import sys
+import cmd
+import gzip
+import json
+import time
+import linecache
+import threading
+import repr as reprlib
+
+
+def _limiter(max_repr):
+    """Return a Repr which abbreviates values to about max_repr characters.
+
+    Containers are abbreviated as they're formatted, so large ones
+    cost no more to describe than small ones.
+    """
+    limiter = reprlib.Repr()
+    limiter.maxstring = limiter.maxother = limiter.maxlong = max_repr
+    limiter.maxlevel = 3
+    limiter.maxlist = limiter.maxtuple = limiter.maxdict = 10
+    limiter.maxset = limiter.maxfrozenset = limiter.maxdeque = 10
+    limiter.maxarray = 10
+    return limiter
+
+
+def _repr(value, max_repr, limiter=None):
+    """Return a repr of value, truncated to max_repr characters."""
+    try:
+        text = (limiter or _limiter(max_repr)).repr(value)
+    except Exception, ex:
+        text = "<unrepresentable: %s>" % type(ex).__name__
+    if len(text) > max_repr:
+        text = text[:max_repr - 3] + "..."
+    return text
+
+
+def _frame(frame, lineno, f_locals=None):
+    """Return a description of a frame, stopped at lineno."""
+    filename = frame.f_code.co_filename
+    return {'filename': filename,
+            'lineno': lineno,
+            'function': frame.f_code.co_name,
+            'line': linecache.getline(filename, lineno).strip(),
+            'locals': f_locals}
+
+
+def _stack(frame, max_frames):
+    """Return the innermost max_frames of a stack, outermost first."""
+    stack = []
+    while frame is not None and len(stack) < max_frames:
+        stack.append(_frame(frame, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def capture(type, value, tb, max_frames=50, max_locals=50, max_repr=200):
+    """Capture a snapshot of an exception, returning it as a dict.
+
+    Only the innermost max_frames of the traceback and of each
+    thread's stack are kept. Each frame in the traceback records at
+    most max_locals locals, each as an abbreviated repr of at most
+    max_repr characters.
+    """
+    tbs = []
+    while tb is not None:
+        tbs.append(tb)
+        tb = tb.tb_next
+
+    limiter = _limiter(max_repr)
+    frames = []
+    for tb in tbs[-max_frames:]:
+        f_locals = tb.tb_frame.f_locals
+        frames.append(_frame(tb.tb_frame, tb.tb_lineno, dict(
+                    (name, _repr(f_locals[name], max_repr, limiter))
+                    for name in sorted(f_locals)[:max_locals])))
+
+    names = dict((thread.ident, thread.name)
+                 for thread in threading.enumerate())
+    threads = dict((names.get(ident, str(ident)), _stack(frame, max_frames))
+                   for (ident, frame) in sys._current_frames().items())
+
+    return {'exception': type.__name__,
+            'message': _repr(value, max_repr),
+            'time': time.time(),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+            'frames': frames,
+            'threads': threads}
+
+
+def save(snapshot, path):
+    """Write a snapshot to path, as compressed JSON."""
+    output = gzip.open(path, 'wb')
+    try:
+        json.dump(snapshot, output, separators=(',', ':'))
+    finally:
+        output.close()
+
+
+def load(path):
+    """Load a snapshot written by save()."""
+    input = gzip.open(path, 'rb')
+    try:
+        return json.load(input)
+    finally:
+        input.close()
+
+
+class browser(cmd.Cmd):
+
+    """Browse a snapshot, with commands modelled on pdb's."""
+
+    prompt = "(snapshot) "
+
+    def __init__(self, snapshot, stdin=None, stdout=None):
+        cmd.Cmd.__init__(self, stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+        self.snapshot = snapshot
+        self.frames = snapshot['frames']
+        self.index = len(self.frames) - 1
+        self.intro = "%s: %s in thread %s at %s" % (
+            snapshot['exception'], snapshot['message'], snapshot['thread'],
+            time.ctime(snapshot['time']))
+
+    def preloop(self):
+        self.print_frame(self.frames[self.index], current=True)
+
+    def print_frame(self, frame, current=False):
+        self.stdout.write('%s %s(%d)%s()\n-> %s\n' % (
+                '>' if current else ' ', frame['filename'], frame['lineno'],
+                frame['function'], frame['line']))
+
+    def do_where(self, arg):
+        """w(here): Print the traceback, marking the current frame."""
+        for (index, frame) in enumerate(self.frames):
+            self.print_frame(frame, index == self.index)
+    do_w = do_where
+    do_bt = do_where
+
+    def do_up(self, arg):
+        """u(p): Move to the frame which called this one."""
+        if self.index == 0:
+            self.stdout.write("*** Oldest frame\n")
+            return
+        self.index -= 1
+        self.print_frame(self.frames[self.index], current=True)
+    do_u = do_up
+
+    def do_down(self, arg):
+        """d(own): Move to the frame called by this one."""
+        if self.index == len(self.frames) - 1:
+            self.stdout.write("*** Newest frame\n")
+            return
+        self.index += 1
+        self.print_frame(self.frames[self.index], current=True)
+    do_d = do_down
+
+    def do_locals(self, arg):
+        """locals: Print the locals of the current frame."""
+        for (name, value) in sorted(self.frames[self.index]['locals'].items()):
+            self.stdout.write("%s = %s\n" % (name, value))
+
+    def do_p(self, arg):
+        """p NAME: Print a local of the current frame."""
+        f_locals = self.frames[self.index]['locals']
+        if arg not in f_locals:
+            self.stdout.write("*** NameError: %s\n" % arg)
+            return
+        self.stdout.write("%s\n" % f_locals[arg])
+
+    def do_threads(self, arg):
+        """threads: Print the stack of every thread."""
+        for (name, stack) in sorted(self.snapshot['threads'].items()):
+            self.stdout.write("Thread %s:\n" % name)
+            for frame in stack:
+                self.print_frame(frame)
+
+    def do_quit(self, arg):
+        """q(uit): Stop browsing."""
+        return True
+    do_q = do_quit
+    do_EOF = do_quit
+
+
+def browse(path):
+    """Browse the snapshot in path interactively."""
+    browser(load(path)).cmdloop()
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.stderr.write("Usage: python -m tillicum.snapshot FILE\n")
+        sys.exit(2)
+    browse(sys.argv[1])
+
+
+if __name__ == '__main__':
+    main()
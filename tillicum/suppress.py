@@ -11,10 +11,13 @@ import logging
 from contextlib import contextmanager
 from collections import defaultdict
 
-from ostrich import stats
+from . import registry
+from . lazy import lazy_import
 
+stats = lazy_import('ostrich.stats', globals())
 
-def make_suppress(exceptions, interval, threshold):
+
+def make_suppress(exceptions, interval, threshold, name=None):
     """Return a context manager which manages exceptions.
 
     The returned context manager will suppress any exception listed in
@@ -31,9 +34,17 @@ def make_suppress(exceptions, interval, threshold):
     generally should not be used in between throttle or
     retry-decorated code, as it will swallow exceptions and interfere
     with their error detection.
+
+    Counts of suppressed and raised exceptions are kept in
+    tillicum.registry, under name; this defaults to the names of the
+    exceptions.
     """
 
+    if not isinstance(exceptions, (list, tuple)):
+        exceptions = (exceptions,)
     __BUCKET_ERRORS = []
+    instrument = registry.register('suppress', name or "/".join(
+            ex.__name__ for ex in exceptions))
 
     def threshold_suppress():
         """Suppress errors as long as they stay below a threshold."""
@@ -56,10 +67,12 @@ def make_suppress(exceptions, interval, threshold):
             errors[type(ex)] += 1
             if errors[type(ex)] < threshold:
                 stats.incr('%s_suppressed' % type(ex).__name__)
+                instrument.incr('suppressed')
                 logging.exception("Suppressing error: %s", ex)
                 return
             logging.debug("Too many %s errors, raising", type(ex))
             stats.incr('%s_suppress_failures' % type(ex).__name__)
+            instrument.incr('raised')
             raise
 
     return contextmanager(threshold_suppress)
@@ -7,66 +7,60 @@
 """Tests for tillicum.backoff."""
 
 import unittest
-import time
+import multiprocessing
 
 from tillicum.test_tools import patch_object
+from tillicum.clock import use_clock, VirtualClock
 import tillicum.backoff as bo
 
 class BackoffTest(unittest.TestCase):
 
     def test_backs_off_once_manager(self):
-        calls = []
-        def fails_once():
-            if not calls:
-                calls.append(1)
-                raise ValueError("whoops")
-            return 42
+        with use_clock(VirtualClock()) as clock:
+            def fails():
+                with bo.backoff():
+                    clock.sleep(2)
+                    raise ValueError("whoops")
 
-        with patch_object(bo.time, 'sleep') as sleep:
-            with bo.backoff():
-                self.assertRaises(ValueError, fails_once)
+            self.assertRaises(ValueError, fails)
 
-        self.assertTrue(sleep.called)
+        # Two seconds in the call, then pow(2, 1) backing off.
+        self.assertEqual(clock.time(), 4)
 
     def test_backs_off_once_decorator(self):
-        calls = []
-        def fails_once():
-            if not calls:
-                calls.append(1)
+        with use_clock(VirtualClock()) as clock:
+            def fails():
+                clock.sleep(2)
                 raise ValueError("whoops")
-            return 42
 
-        with patch_object(bo.time, 'sleep') as sleep:
-            self.assertRaises(ValueError, bo.backoff()(fails_once))
+            self.assertRaises(ValueError, bo.backoff()(fails))
 
-        self.assertTrue(sleep.called)
+        self.assertEqual(clock.time(), 4)
 
     def test_min_sleep(self):
-        calls = []
-        def fails():
-            time.sleep(.1)
-            raise ValueError("Whoops.")
+        with use_clock(VirtualClock()) as clock:
+            def fails():
+                clock.sleep(.1)
+                raise ValueError("Whoops.")
 
-        f = bo.backoff(min_sleep=1)(fails)
-        with patch_object(bo.time, 'sleep') as sleep:
-            self.assertRaises(ValueError, f)
+            self.assertRaises(ValueError, bo.backoff(min_sleep=1)(fails))
 
-        self.assertTrue(sleep.called)
-        self.assertTrue(sleep.call_args[0][0] >= 1)
+        # A tenth of a second in the call, then at least min_sleep.
+        self.assertAlmostEqual(clock.time(), 1.1)
 
     def test_delay_increases(self):
-        calls = []
+        clock = VirtualClock()
         def fails():
-            for x in xrange(10000000):
-                pass
+            clock.advance(2)
             raise ValueError("Whoops.")
 
         last_delay = -1
         limit = 60
         f = bo.backoff(limit=limit)(fails)
         for x in range(15):
-            with patch_object(bo.time, 'sleep') as sleep:
-                self.assertRaises(ValueError, f)
+            with patch_object(clock, 'sleep') as sleep:
+                with use_clock(clock):
+                    self.assertRaises(ValueError, f)
 
             self.assertTrue(sleep.call_args[0][0] > last_delay or
                             sleep.call_args[0][0] == limit,
@@ -76,5 +70,75 @@ class BackoffTest(unittest.TestCase):
             last_delay = sleep.call_args[0][0]
 
 
+class HistoryTest(unittest.TestCase):
+
+    def test_counts_recent(self):
+        hist = bo.history(3)
+        self.assertEqual(hist.record(True), (1, 1))
+        self.assertEqual(hist.record(False), (1, 2))
+        self.assertEqual(hist.record(True), (2, 3))
+        self.assertEqual(hist.record(False), (1, 3))
+        self.assertEqual(hist.record(False), (1, 3))
+        self.assertEqual(hist.record(False), (0, 3))
+
+    def test_no_recent(self):
+        self.assertEqual(bo.history(0).record(True), (0, 0))
+        with use_clock(VirtualClock()) as clock:
+            self.assertRaises(ValueError, bo.backoff(min_sleep=5, recent=0)(
+                    lambda: int('x')))
+        self.assertEqual(clock.time(), 0)
+
+    def test_shared(self):
+        hist = bo.shared_history(3)
+        for x in range(4):
+            hist.record(True)
+        self.assertEqual(hist.record(False), (2, 3))
+
+
+class KeyedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = bo.get_store()
+
+    def tearDown(self):
+        bo.set_store(self.store)
+
+    def fails(self):
+        raise ValueError("Whoops.")
+
+    def succeeds(self):
+        return 42
+
+    def test_shares_history(self):
+        bo.set_store(bo.store())
+        with use_clock(VirtualClock()) as clock:
+            self.assertRaises(ValueError,
+                              bo.backoff(min_sleep=5, key='svc')(self.fails))
+            bo.backoff(min_sleep=5, key='svc')(self.succeeds)()
+            bo.backoff(min_sleep=5, key='other')(self.succeeds)()
+
+        self.assertEqual(clock.time(), 10)
+
+    def test_unkeyed_private(self):
+        with use_clock(VirtualClock()) as clock:
+            self.assertRaises(ValueError,
+                              bo.backoff(min_sleep=5)(self.fails))
+            bo.backoff(min_sleep=5)(self.succeeds)()
+
+        self.assertEqual(clock.time(), 5)
+
+    def test_shared_store(self):
+        bo.set_store(bo.shared_store(['svc']))
+        child = multiprocessing.Process(
+            target=bo.backoff(key='svc').delay, args=(ValueError(), 0))
+        child.start()
+        child.join()
+        self.assertEqual(bo.get_store().get('svc', 10).record(False), (1, 2))
+
+    def test_shared_store_keys(self):
+        store = bo.shared_store(['svc'])
+        self.assertRaises(KeyError, store.get, 'other', 10)
+
+
 if __name__ == '__main__':
     unittest.main()
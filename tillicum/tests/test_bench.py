@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.bench."""
+
+import unittest
+import socket
+
+from tillicum.clock import use_clock, VirtualClock
+from tillicum.retry import retry
+from tillicum.bench import overhead, scenarios, bulkhead, upstream as up
+
+
+class UpstreamTest(unittest.TestCase):
+
+    def test_latency(self):
+        upstream = up.Upstream(up.constant(0.5))
+        with use_clock(VirtualClock()) as clock:
+            upstream.call()
+        self.assertEqual(clock.time(), 0.5)
+
+    def test_errors(self):
+        upstream = up.Upstream(error_rate=1)
+        with use_clock(VirtualClock()):
+            self.assertRaises(socket.error, upstream.call)
+        self.assertEqual(upstream.errors, 1)
+
+    def test_overload(self):
+        upstream = up.Upstream(up.constant(0), capacity=10, seed=0)
+        with use_clock(VirtualClock()):
+            for x in range(100):
+                try:
+                    upstream.call()
+                except up.Overloaded:
+                    pass
+        self.assertTrue(upstream.errors > 50)
+
+    def test_seeded(self):
+        def latencies():
+            upstream = up.Upstream(up.lognormal(0.05), seed=42)
+            return [upstream.latency(upstream.random) for x in range(10)]
+        self.assertEqual(latencies(), latencies())
+
+
+class ScenariosTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        result = scenarios.percentiles(range(1000))
+        self.assertEqual(result['p50'], 500)
+        self.assertEqual(result['p999'], 999)
+        self.assertEqual(result['max'], 999)
+
+    def test_simulate(self):
+        upstream = up.Upstream(up.constant(0.1), error_rate=0)
+        report = scenarios.simulate(upstream, requests=100, rate=5)
+        self.assertEqual(report['successes'], 100)
+        self.assertAlmostEqual(report['duration'], 99 / 5.0 + 0.1)
+        self.assertAlmostEqual(report['latency']['p50'], 0.1)
+        self.assertEqual(report['amplification'], 1)
+
+    def test_retry_amplifies(self):
+        upstream = up.Upstream(error_rate=0.5, seed=0)
+        report = scenarios.simulate(upstream, wrap=retry(), requests=100)
+        self.assertTrue(report['amplification'] > 1)
+
+    def test_run(self):
+        results = scenarios.run(requests=50)
+        self.assertEqual(sorted(results.keys()),
+                         sorted(scenarios.scenarios().keys()))
+
+
+class OverheadTest(unittest.TestCase):
+
+    def test_primitives(self):
+        results = overhead.primitives(number=10)
+        self.assertTrue('bare' in results)
+        self.assertTrue('ratelimit' in results)
+
+
+class BulkheadTest(unittest.TestCase):
+
+    def test_isolates(self):
+        report = bulkhead.compare(workers=4, requests=40, rate=400,
+                                  slow=0.05, limit=1)
+        self.assertEqual(report['shared']['slow']['shed'], 0)
+        self.assertTrue(report['bulkhead']['slow']['shed'] > 0)
+        self.assertEqual(report['bulkhead']['fast']['shed'], 0)
+        self.assertTrue(report['bulkhead']['fast']['latency']['p50'] <
+                        report['shared']['fast']['latency']['p50'])
+
+
+if __name__ == '__main__':
+    unittest.main()
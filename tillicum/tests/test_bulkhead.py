@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.bulkhead."""
+
+import time
+import unittest
+import threading
+
+import tillicum.bulkhead as bh
+import tillicum.registry as reg
+from tillicum.deadline import deadline
+
+
+class Holder(threading.Thread):
+
+    """Hold a slot in a bulkhead until released."""
+
+    def __init__(self, manager):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.manager = manager
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.error = None
+
+    def run(self):
+        try:
+            with self.manager:
+                self.entered.set()
+                self.release.wait()
+        except Exception, ex:
+            self.error = ex
+            self.entered.set()
+
+
+class BulkheadTest(unittest.TestCase):
+
+    def setUp(self):
+        bh.clear()
+        reg.clear()
+        self.threads = []
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.release.set()
+            thread.join(1)
+
+    def hold(self, *args, **kwargs):
+        """Start a thread holding a slot, or waiting for one."""
+        thread = Holder(bh.bulkhead(*args, **kwargs))
+        self.threads.append(thread)
+        thread.start()
+        return thread
+
+    def wait_queued(self, name, n):
+        part = bh.get_partition(name)
+        for x in range(200):
+            if len(part.waiting) == n:
+                return
+            time.sleep(0.005)
+        self.fail("%d callers never queued" % n)
+
+    def test_passthrough(self):
+        self.assertEqual(bh.bulkhead('test')(lambda: 42)(), 42)
+        self.assertEqual(bh.get_partition('test').active, 0)
+
+    def test_releases_on_error(self):
+        def fails():
+            raise ValueError("Whoops.")
+
+        self.assertRaises(ValueError, bh.bulkhead('test', limit=1)(fails))
+        self.assertEqual(bh.get_partition('test').active, 0)
+
+    def test_sheds(self):
+        self.hold('test', limit=1).entered.wait(1)
+        self.assertRaises(bh.BulkheadFull, bh.bulkhead('test').__enter__)
+        stats = reg.snapshot()['bulkhead']['test']
+        self.assertEqual(stats['counters']['shed'], 1)
+        self.assertEqual(stats['gauges']['active'], 1)
+
+    def test_partitions_isolated(self):
+        self.hold('slow', limit=1).entered.wait(1)
+        self.assertEqual(bh.bulkhead('fast', limit=1)(lambda: 42)(), 42)
+
+    def test_waits(self):
+        holder = self.hold('test', limit=1, queue=1)
+        holder.entered.wait(1)
+        waiter = self.hold('test')
+        self.wait_queued('test', 1)
+        self.assertFalse(waiter.entered.is_set())
+        holder.release.set()
+        self.assertTrue(waiter.entered.wait(1))
+        self.assertEqual(waiter.error, None)
+
+    def test_timeout(self):
+        self.hold('test', limit=1, queue=1).entered.wait(1)
+        start = time.time()
+        self.assertRaises(bh.BulkheadFull,
+                          bh.bulkhead('test', timeout=0.05).__enter__)
+        self.assertTrue(time.time() - start >= 0.05)
+        self.assertEqual(bh.get_partition('test').waiting, [])
+
+    def test_deadline(self):
+        self.hold('test', limit=1, queue=1).entered.wait(1)
+        with deadline(0.05):
+            self.assertRaises(bh.BulkheadFull,
+                              bh.bulkhead('test', timeout=10).__enter__)
+
+    def test_priority(self):
+        holder = self.hold('test', limit=1, queue=2)
+        holder.entered.wait(1)
+        low = self.hold('test', priority=0)
+        self.wait_queued('test', 1)
+        high = self.hold('test', priority=1)
+        self.wait_queued('test', 2)
+        holder.release.set()
+        self.assertTrue(high.entered.wait(1))
+        self.assertFalse(low.entered.is_set())
+
+    def test_displaces_lower_priority(self):
+        self.hold('test', limit=1, queue=1).entered.wait(1)
+        low = self.hold('test', priority=0)
+        self.wait_queued('test', 1)
+        high = self.hold('test', priority=1)
+        self.assertTrue(low.entered.wait(1))
+        self.assertTrue(isinstance(low.error, bh.BulkheadFull))
+        self.assertFalse(high.entered.is_set())
+
+    def test_full_queue_sheds_newcomer(self):
+        self.hold('test', limit=1, queue=1).entered.wait(1)
+        self.hold('test', priority=1)
+        self.wait_queued('test', 1)
+        self.assertRaises(bh.BulkheadFull,
+                          bh.bulkhead('test', priority=1).__enter__)
+
+    def test_same_priority_not_displaced(self):
+        """A timeout doesn't let a caller displace one of equal priority."""
+        self.hold('test', limit=1, queue=1).entered.wait(1)
+        queued = self.hold('test')
+        self.wait_queued('test', 1)
+        self.assertRaises(bh.BulkheadFull,
+                          bh.bulkhead('test', timeout=5).__enter__)
+        self.assertFalse(queued.entered.is_set())
+        self.assertEqual(len(bh.get_partition('test').waiting), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.circuit."""
+
+import unittest
+
+from tillicum.clock import use_clock, VirtualClock
+import tillicum.circuit as cir
+
+
+class CircuitTest(unittest.TestCase):
+
+    def fails(self):
+        raise ValueError("Whoops.")
+
+    def test_opens(self):
+        f = cir.circuit(threshold=2)(self.fails)
+        self.assertRaises(ValueError, f)
+        self.assertRaises(ValueError, f)
+        self.assertRaises(cir.CircuitOpen, f)
+
+    def test_success_resets(self):
+        breaker = cir.circuit(threshold=2)
+        self.assertRaises(ValueError, breaker(self.fails))
+        self.assertEqual(breaker(lambda: 42)(), 42)
+        self.assertRaises(ValueError, breaker(self.fails))
+        self.assertRaises(ValueError, breaker(self.fails))
+
+    def test_ignores_other_exceptions(self):
+        f = cir.circuit(threshold=1, exceptions=(KeyError,))(self.fails)
+        self.assertRaises(ValueError, f)
+        self.assertRaises(ValueError, f)
+
+    @use_clock(VirtualClock())
+    def test_half_open(self):
+        breaker = cir.circuit(threshold=1, reset=30)
+        self.assertRaises(ValueError, breaker(self.fails))
+        cir.clock.sleep(29)
+        self.assertRaises(cir.CircuitOpen, breaker(self.fails))
+        cir.clock.sleep(1)
+        self.assertRaises(ValueError, breaker(self.fails))
+        self.assertRaises(cir.CircuitOpen, breaker(self.fails))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.clock."""
+
+import unittest
+import time
+
+import tillicum.clock as clock
+import tillicum.deadline as dl
+from tillicum.timer import timer
+from tillicum.test_tools import patch_object
+
+
+class VirtualClockTest(unittest.TestCase):
+
+    def test_sleep_advances(self):
+        vclock = clock.VirtualClock(100)
+        self.assertEqual(vclock.time(), 100)
+        vclock.sleep(3600)
+        self.assertEqual(vclock.time(), 3700)
+
+    def test_ignores_negative(self):
+        vclock = clock.VirtualClock()
+        vclock.sleep(-1)
+        self.assertEqual(vclock.time(), 0)
+
+
+class PreciseClockTest(unittest.TestCase):
+
+    def test_sleeps_long_enough(self):
+        pclock = clock.PreciseClock()
+        for x in range(5):
+            start = time.time()
+            pclock.sleep(0.001)
+            self.assertTrue(time.time() - start >= 0.001 - 1e-6)
+
+    def test_compensates(self):
+        real_sleep = time.sleep
+        def late_sleep(seconds):
+            real_sleep(seconds + 0.005)
+
+        pclock = clock.PreciseClock(weight=0.5)
+        with patch_object(time, 'sleep', late_sleep):
+            for x in range(10):
+                pclock.sleep(0.02)
+            start = time.time()
+            pclock.sleep(0.02)
+            elapsed = time.time() - start
+
+        self.assertTrue(pclock.overshoot >= 0.004)
+        self.assertTrue(elapsed < 0.024, "Slept %.4fs" % elapsed)
+
+    def test_estimate_decays(self):
+        pclock = clock.PreciseClock()
+        pclock.overshoot = 0.005
+        with patch_object(time, 'sleep') as sleep:
+            for x in range(50):
+                pclock.sleep(0.001)
+
+        self.assertTrue(sleep.called)
+        self.assertTrue(pclock.overshoot < 0.001)
+
+
+class UseClockTest(unittest.TestCase):
+
+    def test_installs_and_restores(self):
+        old = clock.get_clock()
+        vclock = clock.VirtualClock()
+        with clock.use_clock(vclock) as installed:
+            self.assertTrue(installed is vclock)
+            self.assertTrue(clock.get_clock() is vclock)
+            clock.sleep(10)
+            self.assertEqual(clock.now(), 10)
+        self.assertTrue(clock.get_clock() is old)
+
+    def test_timer(self):
+        with clock.use_clock(clock.VirtualClock()):
+            with timer() as timings:
+                clock.sleep(5)
+        self.assertEqual(timings[-1], 5)
+
+    def test_deadline(self):
+        with clock.use_clock(clock.VirtualClock()):
+            with dl.deadline(60):
+                clock.sleep(59)
+                self.assertRaises(dl.DeadlineExceeded, dl.sleep, 10)
+                self.assertEqual(clock.now(), 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.deadline."""
+
+import unittest
+
+from tillicum.clock import use_clock, VirtualClock
+import tillicum.deadline as dl
+from tillicum.backoff import backoff
+from tillicum.retry import retry
+from tillicum.throttle import throttle
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_no_deadline(self):
+        self.assertEqual(dl.remaining(), None)
+        dl.check()
+
+    def test_remaining(self):
+        with dl.deadline(10):
+            left = dl.remaining()
+            self.assertTrue(9 < left <= 10)
+        self.assertEqual(dl.remaining(), None)
+
+    def test_decorator(self):
+        f = dl.deadline(10)(dl.remaining)
+        self.assertTrue(9 < f() <= 10)
+
+    def test_inner_cannot_extend(self):
+        with dl.deadline(1):
+            with dl.deadline(10):
+                self.assertTrue(dl.remaining() <= 1)
+            self.assertTrue(dl.remaining() <= 1)
+
+    def test_inner_can_shorten(self):
+        with dl.deadline(10):
+            with dl.deadline(1):
+                self.assertTrue(dl.remaining() <= 1)
+            self.assertTrue(dl.remaining() > 1)
+
+    def test_check_raises(self):
+        with dl.deadline(0):
+            self.assertRaises(dl.DeadlineExceeded, dl.check)
+
+    def test_sleep_cut_short(self):
+        with use_clock(VirtualClock()) as clock:
+            with dl.deadline(1):
+                self.assertRaises(dl.DeadlineExceeded, dl.sleep, 600)
+
+        self.assertEqual(clock.time(), 1)
+
+    def test_sleep_within_budget(self):
+        with use_clock(VirtualClock()) as clock:
+            with dl.deadline(10):
+                dl.sleep(1)
+
+        self.assertEqual(clock.time(), 1)
+
+
+class DeadlinePrimitivesTest(unittest.TestCase):
+
+    def test_retry_stops(self):
+        calls = []
+        def lossy():
+            calls.append(1)
+            raise ValueError("Blah")
+
+        f = retry(100, exceptions=ValueError)(lossy)
+        with dl.deadline(0):
+            self.assertRaises(dl.DeadlineExceeded, f)
+        self.assertEqual(len(calls), 1)
+
+    def test_backoff_cut_short(self):
+        def fails():
+            raise ValueError("Whoops.")
+
+        f = backoff(min_sleep=600)(fails)
+        with use_clock(VirtualClock()) as clock:
+            with dl.deadline(1):
+                self.assertRaises(dl.DeadlineExceeded, f)
+
+        self.assertEqual(clock.time(), 1)
+
+    def test_throttle_cut_short(self):
+        with use_clock(VirtualClock()) as clock:
+            f = throttle(1000000)(lambda: clock.sleep(.001))
+            with dl.deadline(0.5):
+                self.assertRaises(dl.DeadlineExceeded, f)
+
+        self.assertEqual(clock.time(), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
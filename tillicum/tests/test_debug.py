@@ -6,9 +6,15 @@
 
 """Tests for tillicum.debug."""
 
+import os
 import unittest
 import pdb
+import time
 import signal
+import shutil
+import tempfile
+import threading
+from StringIO import StringIO
 
 from tillicum.test_tools import patch_object
 from mock import Mock
@@ -52,6 +58,42 @@ class DebugOnExceptionTest(unittest.TestCase):
         self.assertTrue(debugger.interaction.called)
 
 
+class SnapshotOnExceptionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def raises_(self):
+        return {}['x']
+
+    def test_writes_snapshot(self):
+        deco = dbg.snapshot_on_exception(KeyError, directory=self.dir)
+        self.assertRaises(KeyError, deco(self.raises_))
+        files = os.listdir(self.dir)
+        self.assertEqual(len(files), 1)
+        snapshot = dbg.snapshot.load(os.path.join(self.dir, files[0]))
+        self.assertEqual(snapshot['exception'], 'KeyError')
+
+    def test_ignores_other_exceptions(self):
+        deco = dbg.snapshot_on_exception(ValueError, directory=self.dir)
+        self.assertRaises(KeyError, deco(self.raises_))
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_rate_limited(self):
+        deco = dbg.snapshot_on_exception(directory=self.dir, interval=60)
+        for x in range(10):
+            self.assertRaises(KeyError, deco(self.raises_))
+        self.assertRaises(ValueError, deco(lambda: int('x')))
+        self.assertEqual(len(os.listdir(self.dir)), 2)
+
+    def test_does_not_mask_exception(self):
+        deco = dbg.snapshot_on_exception(directory='/nonexistent')
+        self.assertRaises(KeyError, deco(self.raises_))
+
+
 class LetSignalTest(unittest.TestCase):
 
     def test_saves_handler(self):
@@ -90,5 +132,93 @@ class DebugOnSignalTest(unittest.TestCase):
 
         self.assertTrue(debugger.set_trace.called)
 
+
+def spin_in_hot_function(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+class SamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sampler = dbg._sampler(1000)
+        thread = threading.Thread(target=spin_in_hot_function, args=(0.1,))
+        thread.start()
+        self.sampler.start()
+        thread.join()
+        self.sampler.stop()
+
+    def test_samples(self):
+        self.assertTrue(self.sampler.samples > 0)
+        self.assertTrue(self.sampler.stacks)
+
+    def test_collapsed(self):
+        out = StringIO()
+        self.sampler.write_collapsed(out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            (stack, count) = line.rsplit(" ", 1)
+            self.assertTrue(int(count) > 0)
+        self.assertTrue(
+            [l for l in lines if "(spin_in_hot_function) " in l])
+
+    def test_report(self):
+        out = StringIO()
+        self.sampler.write_report(out, top=1)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue("samples in" in lines[0])
+
+
+class ProfileOnSignalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_sets_and_restores_handler(self):
+        old_h = signal.getsignal(signal.SIGHUP)
+        mgr = dbg.profile_on_signal(signal.SIGHUP)
+        with mgr:
+            self.assertEqual(signal.getsignal(signal.SIGHUP), mgr._handler)
+        self.assertEqual(signal.getsignal(signal.SIGHUP), old_h)
+
+    def test_toggles(self):
+        mgr = dbg.profile_on_signal(signal.SIGHUP,
+                                    os.path.join(self.dir, "prof"))
+        with mgr:
+            os.kill(os.getpid(), signal.SIGHUP)
+            self.assertTrue(mgr.sampler is not None)
+            spin_in_hot_function(0.05)
+            os.kill(os.getpid(), signal.SIGHUP)
+            self.assertTrue(mgr.sampler is None)
+
+        files = sorted(os.listdir(self.dir))
+        self.assertEqual(len(files), 2)
+        self.assertTrue(files[0].endswith(".folded"))
+        self.assertTrue(files[1].endswith(".txt"))
+
+    def test_dumps_on_exit(self):
+        mgr = dbg.profile_on_signal(signal.SIGHUP,
+                                    os.path.join(self.dir, "prof"))
+        with mgr:
+            mgr._handler(signal.SIGHUP, None)
+        self.assertEqual(mgr.sampler, None)
+        self.assertEqual(len(os.listdir(self.dir)), 2)
+
+    def test_same_second(self):
+        mgr = dbg.profile_on_signal(signal.SIGHUP,
+                                    os.path.join(self.dir, "prof"))
+        with mgr:
+            for x in range(3):
+                mgr._handler(signal.SIGHUP, None)
+                mgr._handler(signal.SIGHUP, None)
+        self.assertEqual(len(os.listdir(self.dir)), 6)
+
+
 if __name__ == '__main__':
     unittest.main()
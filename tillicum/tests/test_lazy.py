@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.lazy, and the lazy tillicum package."""
+
+import os
+import sys
+import json
+import unittest
+import subprocess
+
+import tillicum
+from tillicum.lazy import lazy_import
+
+# Import every module and decorate a function, and report what it cost.
+IMPORT_ALL = """
+import sys, time, json
+start = time.time()
+import tillicum
+for name in sorted(tillicum.SUBMODULES):
+    getattr(tillicum, name)
+def f():
+    pass
+tillicum.retry.retry()(f)
+tillicum.bulkhead.bulkhead('f')(f)
+tillicum.circuit.circuit()(f)
+tillicum.timer.timer(f)
+elapsed = time.time() - start
+print json.dumps({'elapsed': elapsed, 'modules': sys.modules.keys()})
+"""
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_replaces_itself(self):
+        namespace = {}
+        namespace['string'] = lazy_import('string', namespace)
+        self.assertEqual(namespace['string'].digits, '0123456789')
+        self.assertTrue(namespace['string'] is sys.modules['string'])
+
+    def test_alias(self):
+        namespace = {}
+        namespace['path'] = lazy_import('os.path', namespace, 'path')
+        self.assertEqual(namespace['path'].join('a', 'b'), 'a/b')
+        self.assertTrue(namespace['path'] is sys.modules['os.path'])
+
+    def test_missing(self):
+        module = lazy_import('tillicum_no_such_module')
+        self.assertRaises(ImportError, getattr, module, 'anything')
+
+
+class NamespaceTest(unittest.TestCase):
+
+    def test_submodule(self):
+        import tillicum.deadline
+        self.assertTrue(tillicum.deadline is sys.modules['tillicum.deadline'])
+
+    def test_export(self):
+        from tillicum.timeout import Timeout
+        self.assertTrue(tillicum.Timeout is Timeout)
+
+    def test_missing(self):
+        self.assertRaises(AttributeError, getattr, tillicum, 'nonexistent')
+
+    def test_dir(self):
+        self.assertTrue('DeadlineExceeded' in dir(tillicum))
+        self.assertTrue('retry' in dir(tillicum))
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    """Catch regressions which make importing tillicum expensive."""
+
+    def test_import_all(self):
+        package = os.path.dirname(os.path.abspath(tillicum.__file__))
+        root = os.path.dirname(package)
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_ALL],
+                                         cwd=root)
+        result = json.loads(output)
+        for heavy in ('ostrich', 'decorator', 'pdb', 'ctypes'):
+            self.assertFalse(heavy in result['modules'],
+                             "%s imported eagerly" % heavy)
+        self.assertTrue(result['elapsed'] < 0.5,
+                        "Importing tillicum took %.3fs" % result['elapsed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
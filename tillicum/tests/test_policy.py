@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.policy."""
+
+import unittest
+
+from ostrich import stats
+
+from tillicum.clock import use_clock, VirtualClock
+from tillicum.policy import policy
+from tillicum.circuit import CircuitOpen
+from tillicum.deadline import DeadlineExceeded
+from tillicum.bench import overhead
+
+
+class PolicyTest(unittest.TestCase):
+
+    def lossy(self, failures):
+        calls = []
+        def lossy():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise ValueError("Blah")
+            return 42
+        return (lossy, calls)
+
+    def test_bare(self):
+        f = policy()(lambda: 42)
+        self.assertEqual(f(), 42)
+
+    def test_keeps_name(self):
+        def talk():
+            pass
+        self.assertEqual(policy()(talk).__name__, 'talk')
+
+    def test_retries(self):
+        (lossy, calls) = self.lossy(2)
+        f = policy().retry(3, exceptions=ValueError)(lossy)
+        self.assertEqual(f(), 42)
+        self.assertEqual(len(calls), 3)
+
+    def test_raises_when_retries_fail(self):
+        (lossy, calls) = self.lossy(10)
+        f = policy().retry(4, exceptions=ValueError)(lossy)
+        self.assertRaises(ValueError, f)
+        self.assertEqual(len(calls), 4)
+
+    def test_no_retry_for_other_exceptions(self):
+        (lossy, calls) = self.lossy(10)
+        f = policy().retry(4, exceptions=KeyError)(lossy)
+        self.assertRaises(ValueError, f)
+        self.assertEqual(len(calls), 1)
+
+    def test_circuit(self):
+        (lossy, calls) = self.lossy(10)
+        f = policy().retry(4, exceptions=ValueError).circuit(2)(lossy)
+        self.assertRaises(CircuitOpen, f)
+        self.assertEqual(len(calls), 2)
+
+    def test_backoff(self):
+        (lossy, calls) = self.lossy(1)
+        f = policy().retry(2, exceptions=ValueError) \
+            .backoff(min_sleep=1)(lossy)
+        with use_clock(VirtualClock()) as clock:
+            self.assertEqual(f(), 42)
+
+        self.assertTrue(clock.time() >= 1)
+
+    def test_throttle_error_only(self):
+        (lossy, calls) = self.lossy(1)
+        with use_clock(VirtualClock()) as clock:
+            def slow():
+                clock.sleep(1)
+                return lossy()
+
+            f = policy().retry(2, exceptions=ValueError) \
+                .throttle(2, error_only=True)(slow)
+            self.assertEqual(f(), 42)
+
+        # Two calls of a second each, and a delay of two after the error.
+        self.assertEqual(clock.time(), 4)
+
+    def test_deadline(self):
+        (lossy, calls) = self.lossy(10)
+        f = policy().deadline(1).retry(-1, exceptions=ValueError) \
+            .backoff(min_sleep=600)(lossy)
+        with use_clock(VirtualClock()) as clock:
+            self.assertRaises(DeadlineExceeded, f)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(clock.time(), 1)
+
+    def test_metrics(self):
+        (lossy, calls) = self.lossy(1)
+        f = policy().metrics('test_policy').retry(1, exceptions=ValueError)(
+            lossy)
+        self.assertRaises(ValueError, f)
+        self.assertEqual(f(), 42)
+        counters = stats.get_counter_stats()
+        self.assertEqual(counters['test_policy_calls'], 2)
+        self.assertEqual(counters['test_policy_errors'], 1)
+        self.assertEqual(stats.get_timing('test_policy_time').count, 2)
+
+
+class OverheadBenchTest(unittest.TestCase):
+
+    def test_compare(self):
+        results = overhead.compare(number=10)
+        self.assertEqual(sorted(results.keys()),
+                         ['bare', 'policy', 'stacked'])
+
+
+if __name__ == '__main__':
+    unittest.main()
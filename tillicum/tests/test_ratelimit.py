@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.ratelimit."""
+
+import unittest
+
+from tillicum.clock import use_clock, VirtualClock
+from tillicum.ratelimit import ratelimit, chunked
+
+
+class RatelimitTest(unittest.TestCase):
+
+    def times(self, *args, **kwargs):
+        """Return the virtual time each item was consumed at."""
+        times = []
+        with use_clock(VirtualClock()) as clock:
+            for x in ratelimit(*args, **kwargs):
+                times.append(clock.time())
+        return times
+
+    def test_passthrough(self):
+        with use_clock(VirtualClock()):
+            self.assertEqual(list(ratelimit(range(10), 100)), range(10))
+
+    def test_limits(self):
+        with use_clock(VirtualClock()) as clock:
+            for x in ratelimit(xrange(100), 10):
+                pass
+
+        self.assertAlmostEqual(clock.time(), 10)
+
+    def test_consumer_time(self):
+        """Time spent consuming items counts towards the limit."""
+        with use_clock(VirtualClock()) as clock:
+            for x in ratelimit(xrange(10), 10):
+                clock.sleep(0.05)
+
+        self.assertAlmostEqual(clock.time(), 1)
+
+    def test_cost(self):
+        times = self.times([1, 2, 3, 4], 10, cost=lambda x: x)
+        for (time, expected) in zip(times, [0, .1, .3, .6]):
+            self.assertAlmostEqual(time, expected)
+
+    def test_bytes(self):
+        times = self.times(['a' * 1000, 'b' * 3000, 'c'], 1000, cost='bytes')
+        self.assertEqual(times, [0, 1, 4])
+
+    def test_bad_cost(self):
+        self.assertRaises(ValueError, list, ratelimit([1], 1, cost='rows'))
+
+    def test_burst(self):
+        times = self.times(xrange(10), 1, burst=5)
+        self.assertEqual(times, [0, 0, 0, 0, 0, 1, 2, 3, 4, 5])
+        self.assertEqual(self.times(xrange(5), 1, burst=2), [0, 0, 1, 2, 3])
+
+    def test_burst_of_one(self):
+        self.assertEqual(self.times(xrange(3), 1, burst=1),
+                         self.times(xrange(3), 1))
+
+    def test_oversized(self):
+        """Items heavier than the burst pass, then delay the next."""
+        times = self.times([100, 1, 1], 10, cost=lambda x: x, burst=10)
+        self.assertEqual(times[0], 0)
+        self.assertAlmostEqual(times[1], 9.1)
+        self.assertAlmostEqual(times[2], 9.2)
+
+
+class ChunkedTest(unittest.TestCase):
+
+    def test_count(self):
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_weight(self):
+        self.assertEqual(list(chunked(['aa', 'bbb', 'c', 'dddd'], 4, 'bytes')),
+                         [['aa'], ['bbb', 'c'], ['dddd']])
+
+    def test_oversized(self):
+        self.assertEqual(list(chunked([1, 10, 1, 1], 3, lambda x: x)),
+                         [[1], [10], [1, 1]])
+
+    def test_empty(self):
+        self.assertEqual(list(chunked([], 3)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
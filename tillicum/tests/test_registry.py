@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.registry."""
+
+import os
+import json
+import shutil
+import socket
+import urllib2
+import tempfile
+import unittest
+from StringIO import StringIO
+from itertools import islice
+
+import tillicum.registry as reg
+from tillicum.clock import use_clock, VirtualClock
+from tillicum.timer import timer
+from tillicum.backoff import backoff
+from tillicum.throttle import throttle
+from tillicum.retry import retry
+from tillicum.seqtimer import seqtimer
+from tillicum.suppress import make_suppress
+from tillicum.policy import policy
+from tillicum.circuit import circuit
+from tillicum.deadline import deadline, DeadlineExceeded
+
+
+def talk():
+    return 42
+
+
+def fails():
+    raise ValueError("Whoops.")
+
+
+class InstrumentTest(unittest.TestCase):
+
+    def test_record(self):
+        inst = reg.instrument('test', 'test')
+        for x in range(10):
+            inst.record(x, ValueError() if x % 2 else None)
+        stats = inst.snapshot()
+        self.assertEqual(stats['calls'], 10)
+        self.assertEqual(stats['errors'], 5)
+        self.assertEqual(stats['latency']['p50'], 5)
+        self.assertEqual(stats['latency']['max'], 9)
+
+    def test_window(self):
+        inst = reg.instrument('test', 'test', window=5)
+        for x in range(10):
+            inst.record(x)
+        self.assertEqual(inst.snapshot()['latency']['window'], 5)
+
+    def test_counters_and_gauges(self):
+        inst = reg.instrument('test', 'test')
+        inst.incr('retries')
+        inst.incr('retries')
+        inst.gauge('delay', 1.5)
+        stats = inst.snapshot()
+        self.assertEqual(stats['counters'], {'retries': 2})
+        self.assertEqual(stats['gauges'], {'delay': 1.5})
+
+
+class RegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        reg.clear()
+
+    def stats(self, kind):
+        return reg.snapshot()[kind][__name__ + '.talk']
+
+    def test_register_once(self):
+        self.assertTrue(reg.register('kind', talk) is
+                        reg.register('kind', talk))
+        self.assertEqual(reg.snapshot().keys(), ['kind'])
+
+    def test_same_name(self):
+        def get():
+            return 1
+        first = get
+
+        def get():
+            return 2
+
+        timer()(first)()
+        timer()(get)()
+        timer()(get)()
+        stats = reg.snapshot()['timer']
+        self.assertEqual(stats[__name__ + '.get']['calls'], 1)
+        self.assertEqual(stats[__name__ + '.get#2']['calls'], 2)
+
+    def test_lambdas(self):
+        functions = [timer()(lambda: 1), timer()(lambda: 2)]
+        for function in functions:
+            function()
+        self.assertEqual(len(reg.snapshot()['timer']), 2)
+
+    def test_forgets_functions(self):
+        def gone():
+            pass
+        reg.register('kind', gone)
+        del gone
+        self.assertEqual(reg.snapshot(), {})
+
+    def test_manager_decorates_several(self):
+        def fails():
+            raise ValueError("Whoops.")
+
+        breaker = circuit(threshold=10)
+        talks = breaker(talk)
+        breaker(fails)
+        for x in range(3):
+            talks()
+        stats = reg.snapshot()['circuit']
+        self.assertEqual(stats[__name__ + '.talk']['calls'], 3)
+        self.assertEqual(stats[__name__ + '.fails']['calls'], 0)
+
+    def test_timer(self):
+        timer()(talk)()
+        self.assertEqual(self.stats('timer')['calls'], 1)
+
+    def test_backoff(self):
+        with use_clock(VirtualClock()):
+            backoff(min_sleep=5)(talk)()
+        stats = self.stats('backoff')
+        self.assertEqual(stats['calls'], 1)
+        self.assertEqual(stats['gauges']['delay'], 0)
+
+    def test_throttle(self):
+        with use_clock(VirtualClock()):
+            throttle(3)(talk)()
+        self.assertEqual(self.stats('throttle')['calls'], 1)
+
+    def test_retry(self):
+        calls = []
+        def talk():
+            calls.append(1)
+            if len(calls) < 2:
+                raise ValueError("Blah")
+            return 42
+
+        retry(exceptions=ValueError)(talk)()
+        stats = self.stats('retry')
+        self.assertEqual(stats['calls'], 1)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['counters']['retries'], 1)
+
+    def test_retry_failure(self):
+        f = retry(2, exceptions=ValueError)(fails)
+        self.assertRaises(ValueError, f)
+        stats = reg.snapshot()['retry'][__name__ + '.fails']
+        self.assertEqual(stats['errors'], 1)
+
+    def test_retry_deadline(self):
+        f = retry(5, exceptions=ValueError)(fails)
+        with deadline(0):
+            self.assertRaises(DeadlineExceeded, f)
+        stats = reg.snapshot()['retry'][__name__ + '.fails']
+        self.assertEqual(stats['calls'], 1)
+        self.assertEqual(stats['errors'], 1)
+
+    def test_policy(self):
+        policy().retry()(talk)()
+        self.assertEqual(self.stats('policy')['calls'], 1)
+
+    def test_seqtimer(self):
+        seq = seqtimer(range(10), name='items', output=StringIO(),
+                       summary=False)
+        for x in islice(seq, 6):
+            pass
+        stats = reg.snapshot()['seqtimer']['items']
+        self.assertEqual(stats['calls'], 5)
+        self.assertEqual(stats['gauges']['items'], 5)
+        self.assertEqual(stats['gauges']['length'], 10)
+        list(seq)
+        self.assertFalse('seqtimer' in reg.snapshot())
+
+    def test_seqtimers_apart(self):
+        first = seqtimer(range(10), name='items', output=StringIO(),
+                         summary=False)
+        second = seqtimer(range(3), name='items', output=StringIO(),
+                          summary=False)
+        list(islice(first, 2))
+        next(second)
+        stats = reg.snapshot()['seqtimer']
+        self.assertEqual(stats['items']['calls'], 1)
+        self.assertEqual(stats['items']['gauges']['length'], 10)
+        self.assertEqual(stats['items#2']['calls'], 0)
+        self.assertEqual(stats['items#2']['gauges']['length'], 3)
+
+    def test_suppress(self):
+        manager = make_suppress((ValueError,), 60, 2)
+        for x in range(2):
+            try:
+                with manager():
+                    fails()
+            except ValueError:
+                pass
+        stats = reg.snapshot()['suppress']['ValueError']
+        self.assertEqual(stats['counters'], {'suppressed': 1, 'raised': 1})
+
+
+class ServeTest(unittest.TestCase):
+
+    def setUp(self):
+        reg.clear()
+        reg.register('kind', talk).record(1)
+
+    def test_http(self):
+        server = reg.serve(('127.0.0.1', 0))
+        try:
+            url = 'http://127.0.0.1:%d/' % server.server_address[1]
+            result = json.load(urllib2.urlopen(url))
+        finally:
+            server.shutdown()
+        self.assertEqual(result['kind'][__name__ + '.talk']['calls'], 1)
+
+    def test_unix(self):
+        dir = tempfile.mkdtemp()
+        path = os.path.join(dir, 'stats.sock')
+        server = reg.serve(path)
+        try:
+            sock = socket.socket(socket.AF_UNIX)
+            sock.connect(path)
+            result = json.load(sock.makefile())
+            sock.close()
+        finally:
+            server.shutdown()
+            shutil.rmtree(dir)
+        self.assertEqual(result['kind'][__name__ + '.talk']['calls'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
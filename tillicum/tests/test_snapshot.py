@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.snapshot."""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import tillicum.snapshot as snap
+
+
+def fails(big, other):
+    local = 'here'
+    raise ValueError("Whoops.")
+
+
+def captured(**limits):
+    try:
+        fails(range(1000), object())
+    except ValueError:
+        return snap.capture(*sys.exc_info(), **limits)
+
+
+class CaptureTest(unittest.TestCase):
+
+    def test_frames(self):
+        snapshot = captured()
+        self.assertEqual(snapshot['exception'], 'ValueError')
+        self.assertEqual(snapshot['frames'][-1]['function'], 'fails')
+        self.assertEqual(snapshot['frames'][-1]['line'],
+                         'raise ValueError("Whoops.")')
+        self.assertEqual(snapshot['frames'][-1]['locals']['local'],
+                         "'here'")
+
+    def test_truncates(self):
+        snapshot = captured(max_repr=20, max_locals=1)
+        f_locals = snapshot['frames'][-1]['locals']
+        self.assertEqual(f_locals.keys(), ['big'])
+        self.assertEqual(len(f_locals['big']), 20)
+
+    def test_max_frames(self):
+        frames = captured(max_frames=1)['frames']
+        self.assertEqual([frame['function'] for frame in frames], ['fails'])
+
+    def test_abbreviates_containers(self):
+        text = snap._repr({'rows': range(1000000)}, 200)
+        self.assertEqual(text, "{'rows': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]}")
+
+    def test_threads(self):
+        snapshot = captured()
+        self.assertTrue(snapshot['thread'] in snapshot['threads'])
+
+    def test_unrepresentable(self):
+        class Bad(object):
+            def __repr__(self):
+                raise RuntimeError()
+        self.assertEqual(snap._repr(Bad(), 100),
+                         "<unrepresentable: RuntimeError>")
+
+
+class SaveLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip(self):
+        snapshot = captured()
+        path = os.path.join(self.dir, "snapshot.gz")
+        snap.save(snapshot, path)
+        self.assertEqual(snap.load(path), snapshot)
+
+
+class BrowserTest(unittest.TestCase):
+
+    def browse(self, commands):
+        out = StringIO()
+        snap.browser(captured(), StringIO(commands), out).cmdloop()
+        return out.getvalue()
+
+    def test_where(self):
+        output = self.browse("where\n")
+        self.assertTrue("> " in output)
+        self.assertTrue("()\n-> raise ValueError" in output)
+
+    def test_up_and_locals(self):
+        output = self.browse("up\nlocals\ndown\np local\n")
+        self.assertTrue("captured()" in output)
+        self.assertTrue("limits = {}" in output)
+        self.assertTrue("'here'" in output)
+
+    def test_threads(self):
+        self.assertTrue("Thread MainThread" in self.browse("threads\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -52,6 +52,11 @@ class ThresholdSuppressTest(unittest.TestCase):
         except ex_type:
             pass
 
+    def test_single_exception(self):
+        manager = suppress.make_suppress(ValueError, 60, 3)
+        with manager():
+            raise ValueError("Whops.")
+
 
 if __name__ == '__main__':
     unittest.main()
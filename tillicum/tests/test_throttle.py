@@ -8,12 +8,32 @@
 
 import unittest
 
+from tillicum.clock import use_clock, VirtualClock
 import tillicum.throttle as throt
 
 class ThrottleTest(unittest.TestCase):
 
-    """"""
+    def test_delays_by_factor(self):
+        with use_clock(VirtualClock()) as clock:
+            with throt.throttle(3):
+                clock.sleep(1)
 
+        self.assertEqual(clock.time(), 4)
+
+    def test_error_only(self):
+        with use_clock(VirtualClock()) as clock:
+            with throt.throttle(3, error_only=True):
+                clock.sleep(1)
+            self.assertEqual(clock.time(), 1)
+
+            def fails():
+                clock.sleep(1)
+                raise ValueError("Whoops.")
+
+            self.assertRaises(ValueError,
+                              throt.throttle(3, error_only=True)(fails))
+
+        self.assertEqual(clock.time(), 5)
 
 
 if __name__ == '__main__':
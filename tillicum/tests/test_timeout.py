@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.timeout."""
+
+import sys
+import unittest
+import signal
+import threading
+import time
+
+import tillicum.timeout as to
+from tillicum.deadline import deadline, DeadlineExceeded
+from tillicum.retry import retry
+from tillicum.policy import policy
+
+
+def spin(seconds):
+    """Busy-wait in Python code for seconds."""
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+class TimeoutTest(unittest.TestCase):
+
+    def test_passes_through(self):
+        self.assertEqual(to.timeout(1)(lambda: 42)(), 42)
+
+    def test_interrupts_sleep(self):
+        f = to.timeout(0.05)(lambda: time.sleep(5))
+        start = time.time()
+        self.assertRaises(to.Timeout, f)
+        self.assertTrue(time.time() - start < 1)
+
+    def test_interrupts_spin(self):
+        with self.assertRaises(to.Timeout):
+            with to.timeout(0.05):
+                spin(5)
+
+    def test_restores_handler(self):
+        old_h = signal.getsignal(signal.SIGALRM)
+        with to.timeout(1):
+            self.assertNotEqual(signal.getsignal(signal.SIGALRM), old_h)
+        self.assertEqual(signal.getsignal(signal.SIGALRM), old_h)
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL)[0], 0)
+
+    def test_nested(self):
+        with self.assertRaises(to.Timeout):
+            with to.timeout(0.1):
+                with to.timeout(0.01):
+                    pass
+                time.sleep(5)
+
+    def test_outer_wins(self):
+        start = time.time()
+        with self.assertRaises(to.Timeout):
+            with to.timeout(0.05):
+                with to.timeout(10):
+                    time.sleep(5)
+        self.assertTrue(time.time() - start < 1)
+
+    def test_deadline(self):
+        with self.assertRaises(DeadlineExceeded):
+            with deadline(0.05):
+                with to.timeout(10):
+                    time.sleep(5)
+
+    def test_is_retried(self):
+        calls = []
+        def slow_once():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(5)
+            return 42
+
+        f = retry()(to.timeout(0.05)(slow_once))
+        self.assertEqual(f(), 42)
+        self.assertEqual(len(calls), 2)
+
+    def test_policy(self):
+        calls = []
+        def slow():
+            calls.append(1)
+            time.sleep(5)
+
+        f = policy().retry(2, exceptions=ValueError).timeout(0.05)(slow)
+        self.assertRaises(to.Timeout, f)
+        self.assertEqual(len(calls), 2)
+
+    def test_watchdog(self):
+        errors = []
+        def run():
+            try:
+                with to.timeout(0.05):
+                    spin(5)
+            except to.Timeout, ex:
+                errors.append(ex)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+
+    def test_watchdog_disarms(self):
+        errors = []
+        def run():
+            try:
+                with to.timeout(0.05):
+                    pass
+                spin(0.2)
+            except to.Timeout, ex:
+                errors.append(ex)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(2)
+        self.assertEqual(errors, [])
+
+    def test_watchdog_withdraws(self):
+        """A timeout fired just as the block ends isn't raised after it."""
+        errors = []
+        def run():
+            # Python 2 only raises asynchronous exceptions every check
+            # interval, which holds this one back until the block ends.
+            interval = sys.getcheckinterval()
+            sys.setcheckinterval(1000000)
+            try:
+                try:
+                    with to.timeout(0.01):
+                        while to._WATCHDOG.pending:
+                            time.sleep(0.001)
+                finally:
+                    sys.setcheckinterval(interval)
+                spin(0.05)
+            except to.Timeout, ex:
+                errors.append(ex)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@
 
 import unittest
 
+from tillicum.clock import use_clock, VirtualClock
 import tillicum.timer as timer
 
 
@@ -44,6 +45,14 @@ class TimerTest(unittest.TestCase):
         self.assertTrue(isinstance(timings, list))
         self.assertEqual(len(timings), 3)
 
+    def test_reused(self):
+        tmr = timer.timer()
+        with use_clock(VirtualClock()) as clock:
+            for x in range(3):
+                with tmr as timings:
+                    clock.sleep(1)
+                self.assertEqual(timings[-1], 1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Tests for tillicum.trace."""
+
+import json
+import unittest
+from StringIO import StringIO
+
+import tillicum.clock
+import tillicum.trace as trace
+from tillicum.clock import use_clock, VirtualClock
+from tillicum.timer import timer
+from tillicum.retry import retry
+from tillicum.backoff import backoff
+from tillicum.throttle import throttle
+from tillicum.ratelimit import ratelimit
+from tillicum.policy import policy
+
+
+def flaky(failures, duration=0):
+    """Return a function which fails the first failures calls.
+
+    Each call takes duration seconds.
+    """
+    calls = []
+
+    def talk():
+        calls.append(1)
+        tillicum.clock.sleep(duration)
+        if len(calls) <= failures:
+            raise ValueError("Whoops.")
+        return 42
+
+    return talk
+
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = trace.MemoryExporter()
+        trace.enable(self.exporter, interval=None)
+
+    def tearDown(self):
+        trace.disable()
+
+    def spans(self):
+        trace.flush()
+        return dict((span.name, span) for span in self.exporter.spans)
+
+    def test_span(self):
+        with use_clock(VirtualClock()) as clock:
+            with trace.span('work', size=3) as span:
+                clock.sleep(2)
+        trace.flush()
+        self.assertEqual(self.exporter.spans, [span])
+        self.assertEqual(span.duration, 2)
+        self.assertEqual(span.tags, {'size': 3})
+        self.assertEqual(span.parent_id, None)
+        self.assertEqual(trace.current(), None)
+
+    def test_nesting(self):
+        with trace.span('outer') as outer:
+            with trace.span('inner') as inner:
+                self.assertTrue(trace.current() is inner)
+            self.assertTrue(trace.current() is outer)
+        self.assertEqual(inner.parent_id, outer.span_id)
+        self.assertEqual(inner.trace_id, outer.trace_id)
+        with trace.span('other') as other:
+            pass
+        self.assertNotEqual(other.trace_id, outer.trace_id)
+
+    def test_error(self):
+        try:
+            with trace.span('work'):
+                raise ValueError("Whoops.")
+        except ValueError:
+            pass
+        self.assertEqual(self.spans()['work'].error, 'ValueError')
+
+    def test_finish_owner(self):
+        owner = object()
+        trace.start('work', owner)
+        trace.finish(object())
+        self.assertEqual(trace.current().name, 'work')
+        trace.finish(owner)
+        self.assertEqual(trace.current(), None)
+
+    def test_ring(self):
+        trace.enable(self.exporter, size=5, batch=2, interval=None)
+        for x in range(8):
+            with trace.span('work', n=x):
+                pass
+        trace.flush()
+        self.assertEqual([span.tags['n'] for span in self.exporter.spans],
+                         [3, 4, 5, 6, 7])
+        self.assertEqual(trace.dropped, 3)
+
+    def test_batches(self):
+        batches = []
+        trace.enable(type('exporter', (), {'export': lambda self, spans:
+                                              batches.append(spans)})(),
+                     batch=2, interval=None)
+        for x in range(5):
+            with trace.span('work'):
+                pass
+        trace.flush()
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+    def test_exporter_error(self):
+        class broken(object):
+            def export(self, spans):
+                raise IOError("Disk full.")
+        trace.enable(broken(), interval=None)
+        with trace.span('work'):
+            pass
+        trace.flush()
+
+    def test_json_lines(self):
+        output = StringIO()
+        trace.enable(trace.JSONLinesExporter(output), interval=None)
+        with trace.span('work', size=3):
+            pass
+        trace.flush()
+        record = json.loads(output.getvalue())
+        self.assertEqual(record['name'], 'work')
+        self.assertEqual(record['tags'], {'size': 3})
+
+    def test_disabled(self):
+        trace.disable()
+        with use_clock(VirtualClock()):
+            backoff(min_sleep=1)(lambda: 42)()
+        trace.flush()
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_timer(self):
+        timer()(lambda: 42)()
+        self.assertTrue('timer' in self.spans())
+
+    def test_retry(self):
+        retry(exceptions=ValueError)(flaky(1))()
+        trace.flush()
+        (first, second, call) = self.exporter.spans
+        self.assertEqual(call.name, 'retry')
+        self.assertEqual((first.tags['attempt'], first.error),
+                         (1, 'ValueError'))
+        self.assertEqual((second.tags['attempt'], second.error), (2, None))
+        self.assertEqual(first.parent_id, call.span_id)
+
+    def test_backoff(self):
+        with use_clock(VirtualClock()):
+            try:
+                backoff(min_sleep=1)(flaky(1))()
+            except ValueError:
+                pass
+        spans = self.spans()
+        self.assertEqual(spans['backoff'].error, 'ValueError')
+        self.assertEqual(spans['sleep'].tags['reason'], 'backoff')
+        self.assertEqual(spans['sleep'].parent_id, spans['backoff'].span_id)
+        self.assertFalse('timer' in spans)
+
+    def test_throttle(self):
+        with use_clock(VirtualClock()) as clock:
+            with throttle(1):
+                clock.sleep(1)
+        spans = self.spans()
+        self.assertEqual(spans['throttle'].duration, 2)
+        self.assertEqual(spans['sleep'].tags, {'reason': 'throttle',
+                                               'seconds': 1})
+
+    def test_ratelimit(self):
+        with use_clock(VirtualClock()):
+            list(ratelimit(range(2), 1))
+        self.assertEqual(self.spans()['sleep'].tags['reason'], 'ratelimit')
+
+    def test_policy(self):
+        with use_clock(VirtualClock()):
+            policy().retry(exceptions=ValueError).throttle(1)(
+                flaky(1, duration=1))()
+        trace.flush()
+        names = [span.name for span in self.exporter.spans]
+        self.assertEqual(names, ['attempt', 'sleep', 'attempt', 'sleep',
+                                 'policy'])
+
+    def test_policy_interrupted(self):
+        def interrupted():
+            raise KeyboardInterrupt()
+
+        self.assertRaises(KeyboardInterrupt,
+                          policy().retry(exceptions=ValueError)(interrupted))
+        self.assertEqual(trace.current(), None)
+        names = [(span.name, span.error) for span in self.spans().values()]
+        self.assertEqual(sorted(names), [('attempt', 'KeyboardInterrupt'),
+                                         ('policy', 'KeyboardInterrupt')])
+
+
+if __name__ == '__main__':
+    unittest.main()
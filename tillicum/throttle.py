@@ -6,9 +6,9 @@
 
 """Throttle calls to a method."""
 
-import time
-
+from . import deadline, trace
 from . contextdecorator import ContextDecorator
+from . timer import timer
 
 
 class throttle(ContextDecorator):
@@ -18,6 +18,10 @@ class throttle(ContextDecorator):
     The call to the inner function is timed, and a delay equivalent to
     that time multiplied by factor is executed before exiting. If
     error_only is set, delay only when an exception has been raised.
+    The delay is cut short, raising DeadlineExceeded, if it would run
+    past the current deadline.
+
+    When tracing, each call is a span, with the delay as a child.
 
     This can be used either as a decorator or context manager.
 
@@ -29,19 +33,34 @@ class throttle(ContextDecorator):
         pass
     """
 
+    instrumented = True
+
     def __init__(self, factor, error_only=False):
         self.factor = factor
         self.error_only = error_only
         self.timer = timer()
+        self.timer.traced = False
         self.time = None
 
-    def __enter__(self):
+    def __enter__(self, instrument=None):
         """Enter the nested context."""
+        if trace.enabled:
+            trace.start('throttle', self)
         self.time = self.timer.__enter__()
 
-    def __exit__(self, type, value, traceback):
+    def __exit__(self, type, value, traceback, instrument=None):
         """Exit the nested context."""
         self.timer.__exit__(type, value, traceback)
+        delay = 0
         if not self.error_only or (self.error_only and type):
-            time.sleep(self.factor * self.time[-1])
+            delay = self.factor * self.time[-1]
+        if instrument is not None:
+            instrument.record(self.time[-1], value)
+            instrument.gauge('delay', delay)
+        try:
+            if delay:
+                deadline.sleep(delay, 'throttle')
+        finally:
+            if trace.enabled:
+                trace.finish(self, type)
         return False
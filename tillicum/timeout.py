@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Bound the time taken by a call."""
+
+import time
+import heapq
+import signal
+import socket
+import threading
+from functools import partial
+from itertools import count
+
+from . import deadline
+from . contextdecorator import ContextDecorator
+from . lazy import lazy_import
+
+ctypes = lazy_import('ctypes', globals())
+
+
+class Timeout(socket.timeout):
+
+    """Raised when a call takes longer than allowed.
+
+    This is a socket.timeout, so retry will retry timed-out calls by
+    default.
+    """
+
+
+class _watchdog(object):
+
+    """Interrupt threads which overrun their time limits.
+
+    A single daemon thread sleeps until the earliest limit passes,
+    then raises an exception asynchronously in the offending thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.pending = []
+        self.active = set()
+        self.fired = {}
+        self.tokens = count()
+        self.thread = None
+
+    def arm(self, seconds, exception):
+        """Raise exception in this thread after seconds."""
+        token = next(self.tokens)
+        with self.lock:
+            self.active.add(token)
+            heapq.heappush(self.pending, (
+                    time.time() + seconds, token,
+                    threading.current_thread().ident, exception))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run,
+                                               name="tillicum-watchdog")
+                self.thread.daemon = True
+                self.thread.start()
+            self.lock.notify()
+        return token
+
+    def disarm(self, token):
+        """Cancel a pending interruption.
+
+        If it was fired but not yet raised, as when the limit passes
+        just as the block ends, the exception is withdrawn.
+        """
+        with self.lock:
+            self.active.discard(token)
+            ident = self.fired.pop(token, None)
+            if ident is not None:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                    ctypes.c_long(ident), None)
+
+    def run(self):
+        with self.lock:
+            while True:
+                while self.pending and self.pending[0][1] not in self.active:
+                    heapq.heappop(self.pending)
+                if not self.pending:
+                    self.lock.wait()
+                    continue
+                wait = self.pending[0][0] - time.time()
+                if wait > 0:
+                    self.lock.wait(wait)
+                    continue
+                (_, token, ident, exception) = heapq.heappop(self.pending)
+                self.active.discard(token)
+                self.fired[token] = ident
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                    ctypes.c_long(ident), ctypes.py_object(exception))
+
+
+_WATCHDOG = _watchdog()
+
+
+class timeout(ContextDecorator):
+
+    """Interrupt wrapped code which runs for more than seconds.
+
+    On the main thread, the limit is enforced with SIGALRM, replacing
+    any handler for the duration of the block; an outer timeout
+    which would expire sooner is left in place. On other threads, a
+    watchdog thread raises the exception asynchronously. This can
+    only happen between Python bytecodes, so a thread blocked in C
+    code (such as a socket read without its own timeout) is not
+    interrupted until that call returns.
+
+    Timeout is raised when the limit passes. If the current deadline
+    would pass first, the block is limited by it, and DeadlineExceeded
+    is raised instead.
+
+    This can be used either as a decorator or context manager.
+
+    with timeout(5):
+        talk()
+
+    @timeout(5)
+    def talk():
+        pass
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.local = threading.local()
+
+    def __enter__(self):
+        (limit, exception) = (self.seconds, Timeout)
+        left = deadline.remaining()
+        if left is not None and left < limit:
+            (limit, exception) = (left, deadline.DeadlineExceeded)
+        if limit <= 0:
+            raise exception("No time left to run")
+
+        stack = self.local.__dict__.setdefault('stack', [])
+        if isinstance(threading.current_thread(), threading._MainThread):
+            stack.append(self._arm_signal(limit, exception))
+        else:
+            stack.append(partial(_WATCHDOG.disarm,
+                                 _WATCHDOG.arm(limit, exception)))
+
+    def __exit__(self, type, value, traceback):
+        disarm = self.local.stack.pop()
+        if disarm is not None:
+            disarm()
+        return False
+
+    def _arm_signal(self, limit, exception):
+        """Raise exception after limit, using SIGALRM.
+
+        Returns a function which restores the handler and timer
+        replaced, or None if an outer timer will expire first.
+        """
+        (outer, _) = signal.getitimer(signal.ITIMER_REAL)
+        if outer and outer <= limit:
+            return None
+
+        def _handler(signum, frame):
+            raise exception("Timed out after %.2fs" % limit)
+
+        old_handler = signal.signal(signal.SIGALRM, _handler)
+        signal.setitimer(signal.ITIMER_REAL, limit)
+        start = time.time()
+
+        def _disarm():
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+            if outer:
+                signal.setitimer(signal.ITIMER_REAL,
+                                 max(outer - (time.time() - start), 1e-6))
+
+        return _disarm
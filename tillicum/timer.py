@@ -6,14 +6,22 @@
 
 """Timing functions."""
 
-import time
+import sys
 from functools import wraps
 
+from . import clock, trace
 from . contextdecorator import ContextDecorator
 
 class timer(ContextDecorator):
 
-    """Time execution of a function."""
+    """Time execution of a function.
+
+    When tracing, each timing is also a span; set traced to False to
+    prevent this.
+    """
+
+    instrumented = True
+    traced = True
 
     def __new__(cls, function=None):
         inst = ContextDecorator.__new__(cls)
@@ -25,21 +33,36 @@ class timer(ContextDecorator):
 
         return inst
 
-    def __enter__(self):
-        self.timings.append(time.time())
+    def __enter__(self, instrument=None):
+        if trace.enabled and self.traced:
+            trace.start('timer', self, function=instrument and
+                        instrument.name)
+        self.timings = [clock.now()]
         return self.timings
 
-    def __exit__(self, type, value, traceback):
-        stop = time.time()
+    def __exit__(self, type, value, traceback, instrument=None):
+        stop = clock.now()
         self.timings.extend([stop, stop - self.timings[0]])
+        if instrument is not None:
+            instrument.record(self.timings[-1], value)
+        if trace.enabled:
+            trace.finish(self, type)
         return False
 
     def __call__(self, function):
         """Act as a decorator."""
+        instrument = self.register(function)
         @wraps(function)
         def __inner__(*args, **kwargs):
-            with self as timings:
+            timings = self.__enter__(instrument)
+            try:
                 retval = function(*args, **kwargs)
+            except:
+                exc_info = sys.exc_info()
+                self.__exit__(exc_info[0], exc_info[1], exc_info[2],
+                              instrument)
+                raise exc_info[0], exc_info[1], exc_info[2]
+            self.__exit__(None, None, None, instrument)
             return (retval, timings)
 
         return __inner__
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# © 2011 SimpleGeo, Inc. All rights reserved.
+# Author: Ian Eure <ian@simplegeo.com>
+#
+
+"""Trace where the time goes in a call.
+
+A span times one operation. Spans nest: one started while another is
+open in the same thread becomes its child. Tillicum's primitives
+open spans of their own, so a trace of a slow call shows each retry
+attempt, and each backoff, throttle or ratelimit sleep, with the
+reason for it.
+
+from tillicum import trace
+
+trace.enable(trace.JSONLinesExporter('/var/log/myapp/spans.json'))
+
+with trace.span('geocode', address=address):
+    geocode(address)
+
+Finished spans go into a ring buffer, which a background thread
+exports in batches. If the exporter falls behind, the oldest spans
+are dropped. Tracing is off until enabled, and costs nothing more
+than a check of trace.enabled while it is.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from itertools import count
+from collections import deque
+
+from . import clock
+from . lazy import lazy_import
+
+json = lazy_import('json', globals())
+
+enabled = False
+
+_local = threading.local()
+_ids = count(1)
+_buffer = deque()
+_exporter = None
+_batch = 100
+_flusher = None
+_flush_lock = threading.Lock()
+dropped = 0
+
+
+class span(object):
+
+    """A timed operation, tagged with details about it.
+
+    Use it as a context manager, or start() it and finish() it
+    yourself. A span which exits with an exception records its type.
+    """
+
+    __slots__ = ('name', 'tags', 'owner', 'trace_id', 'span_id',
+                 'parent_id', 'start', 'duration', 'error')
+
+    def __init__(self, name, owner=None, **tags):
+        self.name = name
+        self.tags = tags
+        self.owner = owner
+        self.trace_id = self.span_id = self.parent_id = None
+        self.start = self.duration = self.error = None
+
+    def tag(self, **tags):
+        """Add tags to the span."""
+        self.tags.update(tags)
+
+    def begin(self):
+        """Start the span, as a child of the current one."""
+        stack = _local.__dict__.setdefault('stack', [])
+        self.span_id = next(_ids)
+        if stack:
+            self.trace_id = stack[-1].trace_id
+            self.parent_id = stack[-1].span_id
+        else:
+            self.trace_id = os.urandom(8).encode('hex')
+        stack.append(self)
+        self.start = clock.now()
+        return self
+
+    def finish(self, error=None):
+        """Finish the span, which failed with error if given.
+
+        Error is an exception, or its type.
+        """
+        self.duration = clock.now() - self.start
+        if error is not None:
+            self.error = (error if isinstance(error, type)
+                          else type(error)).__name__
+        stack = getattr(_local, 'stack', [])
+        if stack and stack[-1] is self:
+            stack.pop()
+        elif self in stack:
+            stack.remove(self)
+        _record(self)
+
+    def as_dict(self):
+        """Return the span as a dict, for export."""
+        return {'trace': self.trace_id,
+                'span': self.span_id,
+                'parent': self.parent_id,
+                'name': self.name,
+                'start': self.start,
+                'duration': self.duration,
+                'error': self.error,
+                'tags': self.tags}
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, type, value, traceback):
+        self.finish(type)
+        return False
+
+
+def current():
+    """Return the innermost open span in this thread, or None."""
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def start(name, owner=None, **tags):
+    """Start and return a span.
+
+    Owner identifies what started it, for finish(); primitives which
+    are both entered and exited through methods use themselves.
+    """
+    return span(name, owner, **tags).begin()
+
+
+def finish(owner, error=None):
+    """Finish the current span, if owner started it."""
+    stack = getattr(_local, 'stack', None)
+    if stack and stack[-1].owner is owner:
+        stack[-1].finish(error)
+
+
+def _record(span):
+    """Buffer a finished span for export."""
+    global dropped
+    if len(_buffer) == _buffer.maxlen:
+        dropped += 1
+    _buffer.append(span)
+
+
+def flush():
+    """Export buffered spans, in batches."""
+    with _flush_lock:
+        while _buffer:
+            batch = []
+            try:
+                while len(batch) < _batch:
+                    batch.append(_buffer.popleft())
+            except IndexError:
+                pass
+            if _exporter is None:
+                continue
+            try:
+                _exporter.export(batch)
+            except Exception:
+                logging.exception("Error exporting %d spans", len(batch))
+
+
+class _flusher_thread(threading.Thread):
+
+    """Flush spans every interval seconds, until stopped."""
+
+    def __init__(self, interval):
+        threading.Thread.__init__(self, name="tillicum-trace")
+        self.daemon = True
+        self.interval = interval
+        self.stopped = False
+
+    def run(self):
+        while not self.stopped:
+            # Real time, as pacing against a virtual clock would spin.
+            time.sleep(self.interval)
+            flush()
+
+
+def enable(exporter, size=10000, batch=100, interval=1):
+    """Start tracing, exporting spans to exporter.
+
+    Up to size finished spans are buffered, and exported batch at a
+    time every interval seconds. If interval is None, spans are only
+    exported by calling flush().
+    """
+    global enabled, _buffer, _exporter, _batch, _flusher, dropped
+    disable()
+    _buffer = deque(maxlen=size)
+    _exporter = exporter
+    _batch = batch
+    dropped = 0
+    if interval is not None:
+        _flusher = _flusher_thread(interval)
+        _flusher.start()
+    enabled = True
+
+
+def disable():
+    """Stop tracing, exporting any spans still buffered."""
+    global enabled, _flusher
+    enabled = False
+    if _flusher is not None:
+        _flusher.stopped = True
+        _flusher = None
+    flush()
+    _local.__dict__.pop('stack', None)
+
+
+atexit.register(flush)
+
+
+class MemoryExporter(object):
+
+    """Keep exported spans in a list, for tests."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+class JSONLinesExporter(object):
+
+    """Write each span as a line of JSON to a file, or a path."""
+
+    def __init__(self, output):
+        if isinstance(output, basestring):
+            output = open(output, 'a')
+        self.output = output
+
+    def export(self, spans):
+        self.output.write("".join(
+                json.dumps(span.as_dict(), separators=(',', ':')) + "\n"
+                for span in spans))
+        self.output.flush()